@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Team, Activity, Leaderboard, Workout
+from .models import User, Team, Activity, ActivityRollup, Leaderboard, LeaderboardBucket, Workout
 
 
 @admin.register(User)
@@ -26,6 +26,14 @@ class ActivityAdmin(admin.ModelAdmin):
     list_filter = ['activity_type', 'date']
 
 
+@admin.register(ActivityRollup)
+class ActivityRollupAdmin(admin.ModelAdmin):
+    """Admin interface for ActivityRollup model"""
+    list_display = ['user_id', 'month', 'total_activities', 'total_calories', 'total_duration']
+    search_fields = ['user_id', 'month']
+    list_filter = ['month']
+
+
 @admin.register(Leaderboard)
 class LeaderboardAdmin(admin.ModelAdmin):
     """Admin interface for Leaderboard model"""
@@ -34,6 +42,14 @@ class LeaderboardAdmin(admin.ModelAdmin):
     list_filter = ['last_updated']
 
 
+@admin.register(LeaderboardBucket)
+class LeaderboardBucketAdmin(admin.ModelAdmin):
+    """Admin interface for LeaderboardBucket model"""
+    list_display = ['user_name', 'window', 'period', 'total_points', 'total_activities', 'expires_at']
+    search_fields = ['user_name', 'period']
+    list_filter = ['window']
+
+
 @admin.register(Workout)
 class WorkoutAdmin(admin.ModelAdmin):
     """Admin interface for Workout model"""
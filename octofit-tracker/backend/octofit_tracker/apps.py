@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class OctofitTrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'octofit_tracker'
+
+    def ready(self):
+        from .metrics import get_config, register_listeners
+        if get_config()['ENABLED']:
+            register_listeners()
@@ -0,0 +1,230 @@
+"""
+Hot/cold tiering for activities.
+
+Activities older than ``settings.ACTIVITY_ARCHIVE_AFTER_DAYS`` are moved out of
+the hot ``activities`` collection into per-month archive collections named
+``activities_archive_YYYY_MM``. Before an archived month is removed from the hot
+collection its per-user totals are folded into ``activity_rollups`` so any
+recomputation of leaderboard totals still sees the archived history.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from pymongo import DESCENDING, DeleteMany, ReplaceOne, UpdateOne
+
+from .mongo import get_db
+
+ARCHIVE_PREFIX = 'activities_archive_'
+
+
+def archive_collection_name(year, month):
+    """Name of the archive collection holding activities for a month"""
+    return f'{ARCHIVE_PREFIX}{year:04d}_{month:02d}'
+
+
+def month_key(year, month):
+    """Rollup key for a month, e.g. '2026-03'"""
+    return f'{year:04d}-{month:02d}'
+
+
+def _month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(value):
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def iter_months(start, end):
+    """Yield (year, month) for every month touching the [start, end) range"""
+    current = _month_start(start)
+    while current < end:
+        yield current.year, current.month
+        current = _next_month(current)
+
+
+def _as_utc(value):
+    if timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
+
+
+def archive_cutoff(now=None, days=None):
+    """
+    Start of the month containing ``now - days``.
+
+    Only whole months are archived so each archive collection is complete once
+    written and never has to be reopened by a later run.
+    """
+    now = _as_utc(now or timezone.now())
+    if days is None:
+        days = settings.ACTIVITY_ARCHIVE_AFTER_DAYS
+    return _month_start(now - timedelta(days=days))
+
+
+def refresh_month_rollups(db, year, month):
+    """Recompute per-user totals for one archived month from its collection"""
+    pipeline = [
+        {'$group': {
+            '_id': '$user_id',
+            'total_activities': {'$sum': 1},
+            'total_points': {'$sum': {'$ifNull': ['$points', 0]}},
+            'total_calories': {'$sum': '$calories'},
+            'total_duration': {'$sum': '$duration'},
+            'total_distance': {'$sum': {'$ifNull': ['$distance', 0]}},
+        }},
+    ]
+    key = month_key(year, month)
+    operations = []
+    for row in db[archive_collection_name(year, month)].aggregate(pipeline):
+        totals = {name: value for name, value in row.items() if name != '_id'}
+        operations.append(UpdateOne(
+            {'user_id': row['_id'], 'month': key},
+            {'$set': dict(totals, user_id=row['_id'], month=key)},
+            upsert=True,
+        ))
+    if operations:
+        db.activity_rollups.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def _months_before(db, cutoff):
+    """Distinct (year, month) pairs that still have hot activities before cutoff"""
+    pipeline = [
+        {'$match': {'date': {'$lt': cutoff}}},
+        {'$group': {'_id': {'year': {'$year': '$date'}, 'month': {'$month': '$date'}}}},
+        {'$sort': {'_id.year': 1, '_id.month': 1}},
+    ]
+    return [(row['_id']['year'], row['_id']['month']) for row in db.activities.aggregate(pipeline)]
+
+
+def archive_activities(cutoff=None, batch_size=None, dry_run=False, db=None, log=None):
+    """
+    Move every hot activity dated before ``cutoff`` into its month's archive.
+
+    Each month is processed in three idempotent steps: copy (upsert by ``_id``)
+    into the archive collection, refresh that month's rollups from the archive,
+    then delete the copied documents from the hot collection. Re-running after
+    an interruption finishes the job without double counting.
+
+    Returns a list of (month_key, archived_count) tuples.
+    """
+    db = db if db is not None else get_db()
+    cutoff = cutoff or archive_cutoff()
+    batch_size = batch_size or settings.ACTIVITY_ARCHIVE_BATCH_SIZE
+    log = log or (lambda message: None)
+
+    summary = []
+    for year, month in _months_before(db, cutoff):
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = min(_next_month(start), cutoff)
+        month_filter = {'date': {'$gte': start, '$lt': end}}
+        count = db.activities.count_documents(month_filter)
+        summary.append((month_key(year, month), count))
+        if dry_run or not count:
+            continue
+
+        archive = db[archive_collection_name(year, month)]
+        archive.create_index([('date', DESCENDING)], name='date_desc')
+        archive.create_index([('user_id', 1), ('date', DESCENDING)], name='user_date')
+
+        archived_ids = []
+        batch = []
+        for document in db.activities.find(month_filter, batch_size=batch_size):
+            batch.append(ReplaceOne({'_id': document['_id']}, document, upsert=True))
+            archived_ids.append(document['_id'])
+            if len(batch) >= batch_size:
+                archive.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            archive.bulk_write(batch, ordered=False)
+
+        refresh_month_rollups(db, year, month)
+
+        deletes = [
+            DeleteMany({'_id': {'$in': archived_ids[i:i + batch_size]}})
+            for i in range(0, len(archived_ids), batch_size)
+        ]
+        db.activities.bulk_write(deletes, ordered=False)
+        log(f'Archived {count} activities from {month_key(year, month)}')
+    return summary
+
+
+def archived_months(db=None):
+    """(year, month) of every existing archive collection, oldest first"""
+    db = db if db is not None else get_db()
+    names = db.list_collection_names(filter={'name': {'$regex': f'^{ARCHIVE_PREFIX}'}})
+    months = []
+    for name in names:
+        year, _, month = name[len(ARCHIVE_PREFIX):].partition('_')
+        if year.isdigit() and month.isdigit():
+            months.append((int(year), int(month)))
+    return sorted(months)
+
+
+def _archived_sources(date_after, date_before, extra_filter, db):
+    """(archive collections newest first, query) for a date range"""
+    date_after = _as_utc(date_after)
+    cutoff = archive_cutoff()
+    end = min(_as_utc(date_before), cutoff) if date_before else cutoff
+    if date_after >= end:
+        return [], None
+
+    existing = set(db.list_collection_names(filter={'name': {'$regex': f'^{ARCHIVE_PREFIX}'}}))
+    query = dict(extra_filter or {})
+    query['date'] = {'$gte': date_after, '$lt': end}
+    names = [archive_collection_name(year, month) for year, month in iter_months(date_after, end)]
+    return [db[name] for name in reversed(names) if name in existing], query
+
+
+def find_archived(date_after, date_before=None, extra_filter=None, db=None, limit=None):
+    """
+    Return archived activity documents dated in [date_after, date_before), newest first.
+
+    Only archive collections that exist and overlap the range are queried.
+    Months are disjoint, so with ``limit`` the newest months are read first and
+    querying stops once ``limit`` documents have been collected.
+    """
+    db = db if db is not None else get_db()
+    collections, query = _archived_sources(date_after, date_before, extra_filter, db)
+    documents = []
+    for collection in collections:
+        cursor = collection.find(query).sort('date', DESCENDING)
+        if limit is not None:
+            remaining = limit - len(documents)
+            if remaining <= 0:
+                break
+            cursor = cursor.limit(remaining)
+        documents.extend(cursor)
+    return documents
+
+
+def count_archived(date_after, date_before=None, extra_filter=None, db=None):
+    """Number of archived activities dated in [date_after, date_before)"""
+    db = db if db is not None else get_db()
+    collections, query = _archived_sources(date_after, date_before, extra_filter, db)
+    return sum(collection.count_documents(query) for collection in collections)
+
+
+def archived_totals_by_user(db=None):
+    """Sum of all archived rollups per user_id, for recomputing lifetime totals"""
+    db = db if db is not None else get_db()
+    pipeline = [
+        {'$group': {
+            '_id': '$user_id',
+            'total_points': {'$sum': '$total_points'},
+            'total_activities': {'$sum': '$total_activities'},
+            'total_calories': {'$sum': '$total_calories'},
+        }},
+    ]
+    return {
+        row['_id']: {
+            'total_points': row['total_points'],
+            'total_activities': row['total_activities'],
+            'total_calories': row['total_calories'],
+        }
+        for row in db.activity_rollups.aggregate(pipeline)
+    }
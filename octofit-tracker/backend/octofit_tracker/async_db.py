@@ -0,0 +1,50 @@
+"""
+Async MongoDB access for the ASGI read path.
+
+Motor clients are bound to the event loop they were created on, so one client
+(and therefore one connection pool) is kept per running loop. Connection
+settings come from ``settings.DATABASES['default']['CLIENT']`` with pool sizing
+from ``ASYNC_MONGO_POOL``. Motor is optional: without it the sync API keeps
+working and only the ``/api/async/`` endpoints fail.
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:  # pragma: no cover - optional dependency
+    AsyncIOMotorClient = None
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_config():
+    config = {
+        'maxPoolSize': 100,
+        'minPoolSize': 0,
+        'waitQueueTimeoutMS': 5000,
+    }
+    config.update(getattr(settings, 'ASYNC_MONGO_POOL', {}))
+    return config
+
+
+def get_async_client():
+    """Return the Motor client for the current event loop"""
+    if AsyncIOMotorClient is None:
+        raise ImproperlyConfigured('The async read path requires motor (see requirements.txt)')
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        options = dict(settings.DATABASES['default'].get('CLIENT', {}))
+        options.update(get_config())
+        client = AsyncIOMotorClient(io_loop=loop, **options)
+        _clients[loop] = client
+    return client
+
+
+def get_async_db():
+    """Return the Motor database configured for the default connection"""
+    return get_async_client()[settings.DATABASES['default']['NAME']]
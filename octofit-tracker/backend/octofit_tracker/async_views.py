@@ -0,0 +1,137 @@
+"""
+Async read-only endpoints for ASGI deployments.
+
+These mirror the plain, paginated list and retrieve responses of the DRF
+viewsets for activities, leaderboard, workouts and teams, but read through
+Motor so a request waiting on MongoDB does not hold a worker thread. They are
+served under ``/api/async/`` next to the synchronous endpoints so both paths
+can be compared with ``manage.py loadtest --compare-async``. They are not a
+drop-in replacement: the activity date filters (and the archive merge behind
+them) and the leaderboard windows are only served by the DRF endpoints, and
+passing those parameters here is answered with 400.
+
+Requests are rate limited with the same token buckets (and ``<basename>.<action>``
+scopes) as the DRF endpoints, keyed by client address since these views do no
+authentication. They only run under ASGI: under WSGI every request would get a
+fresh event loop and with it a new Motor client and pool, so they answer 501.
+"""
+import math
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.utils import timezone
+from pymongo import DESCENDING
+from rest_framework.throttling import BaseThrottle
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import throttling
+
+from .async_db import get_async_db
+from .serializers import ActivitySerializer, LeaderboardSerializer, TeamSerializer, WorkoutSerializer
+
+# collection name, response fields, sort order, router basename (throttle scope prefix)
+RESOURCES = {
+    'activities': ('activities', ActivitySerializer.Meta.fields, [('date', DESCENDING)], 'activity'),
+    'leaderboard': ('leaderboard', LeaderboardSerializer.Meta.fields, None, 'leaderboard'),
+    'workouts': ('workouts', WorkoutSerializer.Meta.fields, None, 'workout'),
+    'teams': ('teams', TeamSerializer.Meta.fields, None, 'team'),
+}
+
+# Query parameters the DRF list endpoints understand but these views do not
+SYNC_ONLY_PARAMS = {
+    'activities': ('date_after', 'date_before'),
+    'leaderboard': ('window', 'period', 'limit', 'user_id'),
+}
+
+
+def _format_value(value):
+    if hasattr(value, 'isoformat'):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        # Same rendering as DRF's DateTimeField for UTC values
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def to_representation(document, fields):
+    """Shape a raw document like the matching DRF serializer"""
+    data = {}
+    for field in fields:
+        value = document['_id'] if field == 'id' else document.get(field)
+        data[field] = _format_value(value)
+    return data
+
+
+def _not_found():
+    return JsonResponse({'detail': 'Not found.'}, status=404)
+
+
+def _refuse(request, scope):
+    """Response for a request that may not proceed, or None"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The async endpoints are only served under ASGI.'}, status=501)
+    wait = throttling.take(request, BaseThrottle().get_ident(request), scope)
+    if wait:
+        response = JsonResponse(
+            {'detail': f'Request was throttled. Expected available in {math.ceil(wait)} seconds.'}, status=429
+        )
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
+    return None
+
+
+async def resource_list(request, resource):
+    collection_name, fields, sort, basename = RESOURCES[resource]
+    refused = _refuse(request, f'{basename}.list')
+    if refused:
+        return refused
+    unsupported = [name for name in SYNC_ONLY_PARAMS.get(resource, ()) if name in request.GET]
+    if unsupported:
+        return JsonResponse(
+            {'detail': f'Only /api/{resource}/ supports {", ".join(unsupported)}.'}, status=400
+        )
+    collection = get_async_db()[collection_name]
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+
+    count = await collection.count_documents({})
+    cursor = collection.find({}, skip=(page - 1) * page_size, limit=page_size)
+    if sort:
+        cursor = cursor.sort(sort)
+    results = [to_representation(document, fields) async for document in cursor]
+    if page > 1 and not results:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page * page_size < count else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return JsonResponse({'count': count, 'next': next_url, 'previous': previous_url, 'results': results})
+
+
+async def resource_detail(request, resource, pk):
+    collection_name, fields, _, basename = RESOURCES[resource]
+    refused = _refuse(request, f'{basename}.retrieve')
+    if refused:
+        return refused
+    try:
+        object_id = ObjectId(pk)
+    except InvalidId:
+        return _not_found()
+    document = await get_async_db()[collection_name].find_one({'_id': object_id})
+    if document is None:
+        return _not_found()
+    return JsonResponse(to_representation(document, fields))
@@ -0,0 +1,28 @@
+"""
+Tiny in-process background queue.
+
+Follow-up work that the client does not need to wait for (such as propagating
+renamed users/teams into denormalized leaderboard copies) is handed to a single
+worker thread so it runs after the response has been returned. Tasks are not
+persisted; anything lost on shutdown is repaired by
+`manage.py verify_leaderboard_names --fix`.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='octofit-background')
+
+
+def _run(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(fn, '__name__', fn))
+        raise
+
+
+def submit(fn, *args, **kwargs):
+    """Queue ``fn(*args, **kwargs)`` on the background worker and return its Future"""
+    return _executor.submit(_run, fn, args, kwargs)
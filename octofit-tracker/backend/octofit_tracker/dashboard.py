@@ -0,0 +1,150 @@
+"""
+Single-request dashboard for the frontend.
+
+``/api/dashboard/`` returns the leaderboard top-K, recent activities, a teams
+summary and featured workouts in one response instead of five paginated
+requests. Each section is a plain function reading through the shared pymongo
+client; the requested sections run concurrently on a small thread pool and
+each result is cached for its own ``TTL`` (see ``settings.DASHBOARD``).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from pymongo import DESCENDING
+
+from .async_views import to_representation
+from .leaderboard import competition_ranks
+from .metrics import record_cache
+from .mongo import get_db
+from .serializers import ActivitySerializer, LeaderboardSerializer, WorkoutSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def get_config():
+    config = {
+        'CACHE_ALIAS': 'default',
+        'WORKERS': 4,
+        'TIMEOUT': 5.0,
+        'SECTIONS': {},
+    }
+    config.update(getattr(settings, 'DASHBOARD', {}))
+    return config
+
+
+def leaderboard_section(limit, db):
+    """All-time top ``limit`` entries with their rank"""
+    cursor = db.leaderboard.find({}).sort([('total_points', DESCENDING), ('user_id', 1)]).limit(limit)
+    documents = list(cursor)
+    ranks = competition_ranks([document.get('total_points') for document in documents])
+    return [
+        dict(to_representation(document, LeaderboardSerializer.Meta.fields), rank=rank)
+        for document, rank in zip(documents, ranks)
+    ]
+
+
+def activities_section(limit, db):
+    """Most recent ``limit`` activities"""
+    cursor = db.activities.find({}).sort('date', DESCENDING).limit(limit)
+    return [to_representation(document, ActivitySerializer.Meta.fields) for document in cursor]
+
+
+def teams_section(limit, db):
+    """Teams with member counts and leaderboard totals, strongest first"""
+    totals = {
+        row['_id']: row
+        for row in db.leaderboard.aggregate([
+            {'$group': {
+                '_id': '$team_id',
+                'total_points': {'$sum': '$total_points'},
+                'total_activities': {'$sum': '$total_activities'},
+            }},
+        ])
+    }
+    teams = []
+    for document in db.teams.find({}, {'name': 1, 'members': 1}):
+        team_id = str(document['_id'])
+        row = totals.get(team_id, {})
+        teams.append({
+            'id': team_id,
+            'name': document.get('name'),
+            'member_count': len(document.get('members') or []),
+            'total_points': row.get('total_points', 0),
+            'total_activities': row.get('total_activities', 0),
+        })
+    teams.sort(key=lambda team: team['total_points'], reverse=True)
+    return teams[:limit]
+
+
+def workouts_section(limit, db):
+    """First ``limit`` workouts by name"""
+    cursor = db.workouts.find({}).sort('name', 1).limit(limit)
+    return [to_representation(document, WorkoutSerializer.Meta.fields) for document in cursor]
+
+
+SECTIONS = {
+    'leaderboard': leaderboard_section,
+    'activities': activities_section,
+    'teams': teams_section,
+    'workouts': workouts_section,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(config):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config['WORKERS'], thread_name_prefix='octofit-dashboard')
+    return _executor
+
+
+def section_config(name, config):
+    options = {'TTL': 30, 'LIMIT': 10}
+    options.update(config['SECTIONS'].get(name, {}))
+    return options
+
+
+def load_section(name, config, db=None):
+    """Return one section from the cache, computing and caching it on a miss"""
+    options = section_config(name, config)
+    cache = caches[config['CACHE_ALIAS']]
+    key = f'dashboard:{name}:{options["LIMIT"]}'
+    data = cache.get(key)
+    record_cache('dashboard', data is not None)
+    if data is None:
+        data = SECTIONS[name](options['LIMIT'], db if db is not None else get_db())
+        if options['TTL']:
+            cache.set(key, data, timeout=options['TTL'])
+    return data
+
+
+def build_dashboard(sections, db=None):
+    """
+    Load ``sections`` concurrently.
+
+    Returns ``(data, errors)``; a section that fails or misses the deadline is
+    left out of ``data`` and named in ``errors`` so the rest still renders.
+    """
+    config = get_config()
+    executor = get_executor(config)
+    futures = {name: executor.submit(load_section, name, config, db) for name in sections}
+    wait(futures.values(), timeout=config['TIMEOUT'])
+
+    data, errors = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            errors[name] = 'Timed out.'
+        elif future.exception() is not None:
+            logger.error('Dashboard section %s failed', name, exc_info=future.exception())
+            errors[name] = 'Unavailable.'
+        else:
+            data[name] = future.result()
+    return data, errors
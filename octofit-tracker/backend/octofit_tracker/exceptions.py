@@ -0,0 +1,13 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class ServiceUnavailable(APIException):
+    """Raised when a saturated resource cannot accept more work; sets Retry-After"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The service is temporarily saturated, please retry.'
+    default_code = 'service_unavailable'
+
+    def __init__(self, detail=None, wait=1):
+        super().__init__(detail)
+        self.wait = wait
@@ -0,0 +1,102 @@
+"""
+Password hashing on a bounded, process-wide pool.
+
+PBKDF2 (and Argon2) hashing is deliberately expensive. ``hash_password`` and
+``hash_passwords`` run ``make_password`` on a bounded thread pool shared by the
+whole process: ``hashlib.pbkdf2_hmac`` releases the GIL, so hashes run in
+parallel on separate cores while the number of concurrent hashes is capped at
+``PASSWORD_HASHING['WORKERS']``. When ``MAX_PENDING`` hashes are already queued
+``HashingBusy`` is raised so callers can shed load instead of piling up.
+The calling request thread still waits for its own hash to finish: the pool
+bounds how many hashes compete for CPU, it does not free the worker.
+Bulk callers draw from a separate, smaller ``BULK_MAX_PENDING`` allowance so a
+large import never takes the slots interactive requests rely on.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashes are already queued"""
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher with the work factor taken from settings"""
+
+    @property
+    def iterations(self):
+        return get_config()['PBKDF2_ITERATIONS']
+
+
+def get_config():
+    config = {
+        'WORKERS': 4,
+        'MAX_PENDING': 64,
+        'BULK_MAX_PENDING': None,  # defaults to WORKERS
+        'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    }
+    config.update(getattr(settings, 'PASSWORD_HASHING', {}))
+    return config
+
+
+_executor = None
+_slots = None
+_bulk_slots = None
+_lock = threading.Lock()
+
+
+def _pool():
+    global _executor, _slots, _bulk_slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                config = get_config()
+                _slots = threading.BoundedSemaphore(config['WORKERS'] + config['MAX_PENDING'])
+                _bulk_slots = threading.BoundedSemaphore(config['BULK_MAX_PENDING'] or config['WORKERS'])
+                _executor = ThreadPoolExecutor(max_workers=config['WORKERS'], thread_name_prefix='octofit-hash')
+    return _executor, _slots, _bulk_slots
+
+
+def _hash(raw_password, slots):
+    # Input is always treated as a raw password: a value that merely looks like
+    # an encoded hash (e.g. 'pbkdf2_sha256$hunter2') must never be stored as is
+    try:
+        return hashers.make_password(raw_password)
+    finally:
+        slots.release()
+
+
+def submit_hash(raw_password):
+    """Queue one hash on the pool; raises HashingBusy if the queue is full"""
+    executor, slots, _ = _pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return executor.submit(_hash, raw_password, slots)
+    except Exception:
+        slots.release()
+        raise
+
+
+def hash_password(raw_password):
+    """Hash one password on the pool and wait for the result"""
+    return submit_hash(raw_password).result()
+
+
+def hash_passwords(raw_passwords):
+    """
+    Hash many passwords in parallel, preserving order.
+
+    Bulk callers wait for one of their own slots instead of failing, so a
+    large import proceeds at the pool's pace while at most BULK_MAX_PENDING of
+    its hashes sit ahead of interactive requests, whose slots stay free.
+    """
+    executor, _, bulk_slots = _pool()
+    futures = []
+    for raw_password in raw_passwords:
+        bulk_slots.acquire()
+        futures.append(executor.submit(_hash, raw_password, bulk_slots))
+    return [future.result() for future in futures]
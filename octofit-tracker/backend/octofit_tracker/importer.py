@@ -0,0 +1,243 @@
+"""
+Streaming activity importer used by `manage.py import_activities`.
+
+Source files are read incrementally (CSV rows, NDJSON lines or GPX tracks via
+``iterparse``) so memory stays flat regardless of file size. Rows are
+normalized to the ``Activity`` document shape in a process pool, written with
+unordered ``insert_many`` chunks, and their leaderboard deltas are accumulated
+so the leaderboard is updated once at the end of the run. Rows a reader
+cannot parse (a malformed NDJSON line, a GPX track with a bad point) are
+yielded as ``INVALID_ROW`` and counted as rejected instead of aborting the run.
+Rows naming a user id or email that does not exist are rejected the same way.
+"""
+import csv
+import json
+import math
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+FORMATS = ('csv', 'ndjson', 'gpx')
+
+# Used when a source row has no calorie figure
+DEFAULT_CALORIES_PER_MINUTE = 8
+
+USER_ALIASES = ('user_id', 'user', 'email', 'user_email')
+TYPE_ALIASES = ('activity_type', 'type', 'sport', 'activity')
+DATE_ALIASES = ('date', 'start_time', 'start_date', 'timestamp')
+
+# Yielded by readers in place of a row that could not be parsed
+INVALID_ROW = {'_invalid': True}
+
+
+def detect_format(path):
+    """Guess the input format from the file extension"""
+    suffix = str(path).rsplit('.', 1)[-1].lower()
+    if suffix in ('jsonl', 'ndjson', 'json'):
+        return 'ndjson'
+    if suffix in FORMATS:
+        return suffix
+    raise ValueError(f'Cannot detect format of {path}; pass --format')
+
+
+def iter_csv(handle):
+    reader = csv.DictReader(handle)
+    while True:
+        try:
+            yield next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            yield INVALID_ROW
+
+
+def iter_ndjson(handle):
+    for line in handle:
+        line = line.strip()
+        if line:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = INVALID_ROW
+            yield row if isinstance(row, dict) else INVALID_ROW
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def iter_gpx(handle):
+    """Yield one row per GPX track, clearing parsed elements as it goes"""
+    track = None
+    for event, element in ET.iterparse(handle, events=('start', 'end')):
+        tag = _local(element.tag)
+        if event == 'start':
+            if tag == 'trk':
+                track = {'start': None, 'end': None, 'last': None, 'distance': 0.0, 'type': None, 'name': None,
+                         'invalid': False}
+            continue
+        if track is None:
+            continue
+        if tag == 'trkpt':
+            try:
+                point = (float(element.get('lat')), float(element.get('lon')))
+                moments = [
+                    parse_datetime(child.text.strip())
+                    for child in element if _local(child.tag) == 'time' and child.text
+                ]
+            except (TypeError, ValueError):
+                track['invalid'] = True
+                element.clear()
+                continue
+            if track['last'] is not None:
+                track['distance'] += haversine_km(*track['last'], *point)
+            track['last'] = point
+            for moment in moments:
+                if moment is None:
+                    track['invalid'] = True
+                    continue
+                track['start'] = track['start'] or moment
+                track['end'] = moment
+            element.clear()
+        elif tag in ('type', 'name') and track[tag] is None:
+            track[tag] = (element.text or '').strip() or None
+        elif tag == 'trk':
+            if track['invalid']:
+                yield INVALID_ROW
+            elif track['start'] is not None:
+                yield {
+                    'activity_type': track['type'] or 'Running',
+                    'date': track['start'].isoformat(),
+                    'duration_seconds': (track['end'] - track['start']).total_seconds(),
+                    'distance_km': round(track['distance'], 3),
+                    'notes': track['name'],
+                }
+            element.clear()
+            track = None
+
+
+READERS = {'csv': iter_csv, 'ndjson': iter_ndjson, 'gpx': iter_gpx}
+
+
+def open_source(path, file_format):
+    """Open a file for the given format and return (handle, row iterator)"""
+    handle = open(path, 'rb') if file_format == 'gpx' else open(path, newline='', encoding='utf-8')
+    return handle, READERS[file_format](handle)
+
+
+def _first(row, names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _number(value):
+    return float(value) if value not in (None, '') else None
+
+
+def _parse_when(value):
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        text = str(value).strip()
+        moment = parse_datetime(text)
+        if moment is None:
+            day = parse_date(text)
+            if day is None:
+                raise ValueError(f'unparseable date {value!r}')
+            moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+# Set in each pool worker by ``init_worker``
+_user_ids_by_email = {}
+_user_ids = frozenset()
+_default_user = None
+
+
+def init_worker(user_ids_by_email, default_user, user_ids=()):
+    """Give a worker the known users; rows naming anyone else are rejected"""
+    global _user_ids_by_email, _user_ids, _default_user
+    _user_ids_by_email = user_ids_by_email
+    _user_ids = frozenset(user_ids) | frozenset(user_ids_by_email.values())
+    _default_user = default_user
+
+
+def normalize_row(row):
+    """Convert a source row to an activity document; raises ValueError if unusable"""
+    if row is INVALID_ROW or row.get('_invalid'):
+        raise ValueError('unparseable row')
+    user = _first(row, USER_ALIASES) or _default_user
+    if not user:
+        raise ValueError('missing user')
+    user = str(user)
+    user_id = _user_ids_by_email.get(user.lower()) if '@' in user else user
+    # Unknown users would otherwise get phantom leaderboard entries
+    if user_id not in _user_ids:
+        raise ValueError(f'unknown user {user!r}')
+
+    date = _first(row, DATE_ALIASES)
+    if date is None:
+        raise ValueError('missing date')
+
+    duration = _number(row.get('duration'))
+    if duration is None:
+        seconds = _number(_first(row, ('duration_seconds', 'elapsed_time', 'moving_time')))
+        duration = seconds / 60 if seconds is not None else None
+    if duration is None:
+        raise ValueError('missing duration')
+
+    distance = _number(_first(row, ('distance', 'distance_km')))
+    if distance is None:
+        meters = _number(row.get('distance_m'))
+        distance = meters / 1000 if meters is not None else None
+
+    calories = _number(row.get('calories'))
+    if calories is None:
+        calories = duration * DEFAULT_CALORIES_PER_MINUTE
+
+    return {
+        'user_id': user_id,
+        'activity_type': str(_first(row, TYPE_ALIASES) or 'Other').strip().title(),
+        'duration': int(round(duration)),
+        'distance': round(distance, 2) if distance is not None else None,
+        'calories': int(round(calories)),
+        'date': _parse_when(date),
+        'notes': row.get('notes') or None,
+    }
+
+
+def normalize_chunk(rows):
+    """Normalize a chunk of rows in a worker; returns (documents, rejected_count)"""
+    documents = []
+    rejected = 0
+    for row in rows:
+        try:
+            documents.append(normalize_row(row))
+        except (ValueError, TypeError, KeyError):
+            rejected += 1
+    return documents, rejected
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,475 @@
+"""
+Incremental leaderboard maintenance.
+
+Instead of recomputing totals from raw activities, every activity write folds
+its contribution into the user's leaderboard document with a single ``$inc``.
+``apply_activities`` works on any number of activities at once so bulk paths
+(the write buffer, importers) issue one ``bulk_write`` per batch.
+
+The same writes also increment time-windowed buckets in
+``leaderboard_buckets``, keyed by ``(window, period, user_id)`` where window is
+one of ``WINDOWS`` and period is e.g. ``2026-10-19``, ``2026-W42`` or
+``2026-10``. Each bucket carries an ``expires_at`` so a TTL index drops it once
+its retention (``settings.LEADERBOARD_WINDOWS``) has passed.
+"""
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.utils import timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .archive import archive_collection_name, archived_months, archived_totals_by_user
+from .models import LeaderboardBucket
+from .mongo import get_db
+from .scoring import score_activity
+
+WINDOWS = ('day', 'week', 'month')
+
+_PERIOD_PATTERNS = {
+    'day': re.compile(r'^(\d{4})-(\d{2})-(\d{2})$'),
+    'week': re.compile(r'^(\d{4})-W(\d{2})$'),
+    'month': re.compile(r'^(\d{4})-(\d{2})$'),
+}
+
+
+def period_key(window, moment):
+    """Period identifier of ``moment`` within a window"""
+    if window == 'day':
+        return f'{moment:%Y-%m-%d}'
+    if window == 'week':
+        year, week, _ = moment.isocalendar()
+        return f'{year}-W{week:02d}'
+    if window == 'month':
+        return f'{moment:%Y-%m}'
+    raise ValueError(f'Unknown window {window!r}')
+
+
+def period_bounds(window, period):
+    """Return the (start, end) UTC datetimes of a period; raises ValueError if invalid"""
+    pattern = _PERIOD_PATTERNS.get(window)
+    match = pattern.match(period) if pattern else None
+    if not match:
+        raise ValueError(f'Invalid period {period!r} for window {window!r}')
+    parts = [int(part) for part in match.groups()]
+    if window == 'day':
+        start = date(*parts)
+        end = start + timedelta(days=1)
+    elif window == 'week':
+        start = date.fromisocalendar(parts[0], parts[1], 1)
+        end = start + timedelta(days=7)
+    else:
+        start = date(parts[0], parts[1], 1)
+        end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return (
+        datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+        datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+    )
+
+
+def bucket_expiry(window, period):
+    """When a bucket may be dropped by the TTL index"""
+    retention = settings.LEADERBOARD_WINDOWS[window]['RETENTION_DAYS']
+    return period_bounds(window, period)[1] + timedelta(days=retention)
+
+
+def activity_points(activity):
+    """Stored points of an activity document, scoring it if it has none yet"""
+    if activity.get('points') is not None:
+        return activity['points']
+    return score_activity(activity)
+
+
+def leaderboard_increments(activities):
+    """Aggregate activity documents into per-user ``$inc`` deltas"""
+    increments = defaultdict(lambda: {'total_points': 0, 'total_activities': 0, 'total_calories': 0})
+    for activity in activities:
+        delta = increments[str(activity['user_id'])]
+        delta['total_points'] += activity_points(activity)
+        delta['total_activities'] += 1
+        delta['total_calories'] += activity.get('calories') or 0
+    return dict(increments)
+
+
+def bucket_increments(activities, now=None):
+    """
+    Aggregate activity documents into per-``(window, period, user_id)`` deltas.
+
+    Activities whose bucket would already have expired are skipped.
+    """
+    now = now or timezone.now()
+    increments = defaultdict(lambda: {'total_points': 0, 'total_activities': 0, 'total_calories': 0})
+    for activity in activities:
+        moment = activity['date']
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, timezone.utc)
+        for window in WINDOWS:
+            period = period_key(window, moment)
+            if bucket_expiry(window, period) <= now:
+                continue
+            delta = increments[(window, period, str(activity['user_id']))]
+            delta['total_points'] += activity_points(activity)
+            delta['total_activities'] += 1
+            delta['total_calories'] += activity.get('calories') or 0
+    return dict(increments)
+
+
+def merge_increments(into, increments):
+    """Add the deltas from ``increments`` into ``into`` in place"""
+    for user_id, delta in increments.items():
+        target = into.setdefault(user_id, {'total_points': 0, 'total_activities': 0, 'total_calories': 0})
+        for field, value in delta.items():
+            target[field] += value
+    return into
+
+
+def user_details(user_ids, db=None):
+    """Map user_id to the denormalized fields stored on leaderboard documents"""
+    db = db if db is not None else get_db()
+    object_ids = []
+    for user_id in user_ids:
+        try:
+            object_ids.append(ObjectId(user_id))
+        except (InvalidId, TypeError):
+            continue
+    users = list(db.users.find({'_id': {'$in': object_ids}}, {'name': 1, 'team_id': 1}))
+
+    team_ids = []
+    for user in users:
+        try:
+            team_ids.append(ObjectId(user.get('team_id')))
+        except (InvalidId, TypeError):
+            continue
+    team_names = {str(team['_id']): team['name'] for team in db.teams.find({'_id': {'$in': team_ids}}, {'name': 1})}
+
+    return {
+        str(user['_id']): {
+            'user_name': user.get('name', ''),
+            'team_id': user.get('team_id'),
+            'team_name': team_names.get(user.get('team_id')),
+        }
+        for user in users
+    }
+
+
+def leaderboard_operations(increments, details, now=None):
+    """Build upserting ``$inc`` operations for the leaderboard collection"""
+    now = now or timezone.now()
+    operations = []
+    for user_id, delta in increments.items():
+        on_insert = dict(details.get(user_id, {'user_name': '', 'team_id': None, 'team_name': None}))
+        operations.append(UpdateOne(
+            {'user_id': user_id},
+            {'$inc': delta, '$set': {'last_updated': now}, '$setOnInsert': on_insert},
+            upsert=True,
+        ))
+    return operations
+
+
+def bucket_operations(increments, details, now=None):
+    """Build upserting ``$inc`` operations for the leaderboard_buckets collection"""
+    now = now or timezone.now()
+    operations = []
+    for (window, period, user_id), delta in increments.items():
+        on_insert = dict(details.get(user_id, {'user_name': '', 'team_id': None, 'team_name': None}))
+        on_insert['expires_at'] = bucket_expiry(window, period)
+        operations.append(UpdateOne(
+            {'window': window, 'period': period, 'user_id': user_id},
+            {'$inc': delta, '$set': {'last_updated': now}, '$setOnInsert': on_insert},
+            upsert=True,
+        ))
+    return operations
+
+
+class LeaderboardWriteFailed(Exception):
+    """
+    Raised by ``apply_increments`` when some deltas could not be written.
+
+    ``increments`` and ``buckets`` hold only the deltas that were not applied,
+    so passing them back to ``apply_increments`` never counts a delta twice.
+    """
+
+    def __init__(self, increments, buckets):
+        super().__init__(f'{len(increments)} leaderboard and {len(buckets)} bucket deltas not applied')
+        self.increments = increments
+        self.buckets = buckets
+
+
+def _write_batches(collection, build_operations, deltas, details, batch_size):
+    """Upsert ``deltas`` batch by batch; returns (deltas not applied, error)"""
+    keys = list(deltas)
+    for i in range(0, len(keys), batch_size):
+        batch = {key: deltas[key] for key in keys[i:i + batch_size]}
+        try:
+            collection.bulk_write(build_operations(batch, details), ordered=False)
+        except BulkWriteError as exc:
+            # Unordered: every operation without a write error was applied
+            batch_keys = list(batch)
+            remaining = {batch_keys[error['index']]: batch[batch_keys[error['index']]]
+                         for error in exc.details.get('writeErrors', [])}
+            remaining.update((key, deltas[key]) for key in keys[i + batch_size:])
+            return remaining, exc
+        except PyMongoError as exc:
+            # Outcome of this batch is unknown (e.g. connection lost); it is retried whole
+            return {key: deltas[key] for key in keys[i:]}, exc
+    return {}, None
+
+
+def apply_increments(increments, buckets=None, db=None, batch_size=1000):
+    """
+    Write precomputed per-user totals and windowed bucket deltas.
+
+    Raises ``LeaderboardWriteFailed`` carrying the unapplied deltas if either
+    collection could not be fully updated.
+    """
+    db = db if db is not None else get_db()
+    buckets = buckets or {}
+    user_ids = list(increments)
+    # One users + teams lookup per batch of users, shared by both collections
+    everyone = list(dict.fromkeys(user_ids + [user_id for _, _, user_id in buckets]))
+    details = {}
+    try:
+        for i in range(0, len(everyone), batch_size):
+            details.update(user_details(everyone[i:i + batch_size], db=db))
+    except PyMongoError as exc:
+        raise LeaderboardWriteFailed(increments, buckets) from exc
+
+    remaining, error = _write_batches(db.leaderboard, leaderboard_operations, increments, details, batch_size)
+    remaining_buckets, bucket_error = _write_batches(
+        db.leaderboard_buckets, bucket_operations, buckets, details, batch_size)
+    if error or bucket_error:
+        raise LeaderboardWriteFailed(remaining, remaining_buckets) from error or bucket_error
+    return len(user_ids)
+
+
+def apply_activities(activities, db=None):
+    """Fold a batch of new activity documents into the leaderboard and its buckets"""
+    return apply_increments(leaderboard_increments(activities), bucket_increments(activities), db=db)
+
+
+def revise_activities(removed, added, db=None):
+    """
+    Apply the difference between activity documents as they were and as they are now.
+
+    Used when activities are edited (``removed`` is the old version, ``added``
+    the new one) or deleted (``added`` is empty). Zero deltas are dropped.
+    """
+    def difference(before, after):
+        deltas = merge_increments({key: {field: -value for field, value in delta.items()}
+                                   for key, delta in before.items()}, after)
+        return {key: delta for key, delta in deltas.items() if any(delta.values())}
+
+    return apply_increments(
+        difference(leaderboard_increments(removed), leaderboard_increments(added)),
+        difference(bucket_increments(removed), bucket_increments(added)),
+        db=db,
+    )
+
+
+def _set_operations(collection_key, totals, details, now, extra_on_insert=None):
+    operations = []
+    for key, values in totals.items():
+        user_id = key[-1] if isinstance(key, tuple) else key
+        on_insert = dict(details.get(user_id, {'user_name': '', 'team_id': None, 'team_name': None}))
+        on_insert.update(extra_on_insert(key) if extra_on_insert else {})
+        operations.append(UpdateOne(
+            collection_key(key),
+            {'$set': dict(values, last_updated=now), '$setOnInsert': on_insert},
+            upsert=True,
+        ))
+    return operations
+
+
+def rebuild_totals(db=None, batch_size=1000):
+    """
+    Recompute every user's all-time totals from stored activity points.
+
+    Hot activities are aggregated directly; archived history comes from
+    ``activity_rollups`` so archive collections are never scanned.
+    """
+    db = db if db is not None else get_db()
+    pipeline = [{'$group': {
+        '_id': '$user_id',
+        'total_points': {'$sum': {'$ifNull': ['$points', 0]}},
+        'total_activities': {'$sum': 1},
+        'total_calories': {'$sum': '$calories'},
+    }}]
+    totals = {
+        row['_id']: {name: row[name] for name in ('total_points', 'total_activities', 'total_calories')}
+        for row in db.activities.aggregate(pipeline, allowDiskUse=True)
+    }
+    merge_increments(totals, archived_totals_by_user(db))
+
+    now = timezone.now()
+    user_ids = list(totals)
+    for i in range(0, len(user_ids), batch_size):
+        batch = {user_id: totals[user_id] for user_id in user_ids[i:i + batch_size]}
+        operations = _set_operations(lambda user_id: {'user_id': user_id}, batch, user_details(batch, db=db), now)
+        db.leaderboard.bulk_write(operations, ordered=False)
+    return len(user_ids)
+
+
+_WINDOW_GROUP_KEYS = {
+    'day': {'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$date'}}},
+    'week': {'year': {'$isoWeekYear': '$date'}, 'week': {'$isoWeek': '$date'}},
+    'month': {'month': {'$dateToString': {'format': '%Y-%m', 'date': '$date'}}},
+}
+
+
+def _group_period(window, group):
+    if window == 'week':
+        return f'{group["year"]}-W{group["week"]:02d}'
+    return group[window]
+
+
+def rebuild_buckets(db=None, batch_size=1000):
+    """
+    Recompute every unexpired windowed bucket from stored activity points.
+
+    Bucket retention can outlast the archive cutoff (monthly buckets are kept
+    400 days, activities are archived after 365), so archive collections for
+    months inside the retention range are aggregated alongside hot activities.
+    """
+    db = db if db is not None else get_db()
+    now = timezone.now()
+    archives = archived_months(db)
+    rebuilt = 0
+    for window in WINDOWS:
+        # Periods are at most 31 days long, so this covers every unexpired bucket
+        since = now - timedelta(days=settings.LEADERBOARD_WINDOWS[window]['RETENTION_DAYS'] + 31)
+        pipeline = [
+            {'$match': {'date': {'$gte': since}}},
+            {'$group': {
+                '_id': dict(_WINDOW_GROUP_KEYS[window], user_id='$user_id'),
+                'total_points': {'$sum': {'$ifNull': ['$points', 0]}},
+                'total_activities': {'$sum': 1},
+                'total_calories': {'$sum': '$calories'},
+            }},
+        ]
+        sources = [db.activities] + [
+            db[archive_collection_name(year, month)]
+            for year, month in archives if (year, month) >= (since.year, since.month)
+        ]
+        totals = {}
+        for source in sources:
+            rows = {}
+            for row in source.aggregate(pipeline, allowDiskUse=True):
+                period = _group_period(window, row['_id'])
+                if bucket_expiry(window, period) <= now:
+                    continue
+                rows[(window, period, row['_id']['user_id'])] = {
+                    name: row[name] for name in ('total_points', 'total_activities', 'total_calories')
+                }
+            # A week can straddle an archived month and the hot collection
+            merge_increments(totals, rows)
+
+        keys = list(totals)
+        for i in range(0, len(keys), batch_size):
+            batch = {key: totals[key] for key in keys[i:i + batch_size]}
+            details = user_details({user_id for _, _, user_id in batch}, db=db)
+            operations = _set_operations(
+                lambda key: {'window': key[0], 'period': key[1], 'user_id': key[2]},
+                batch, details, now,
+                extra_on_insert=lambda key: {'expires_at': bucket_expiry(key[0], key[1])},
+            )
+            db.leaderboard_buckets.bulk_write(operations, ordered=False)
+        rebuilt += len(keys)
+    return rebuilt
+
+
+def propagate_user(user_id, db=None):
+    """Refresh the denormalized user/team fields of one user's leaderboard copies"""
+    db = db if db is not None else get_db()
+    details = user_details([user_id], db=db).get(user_id)
+    if details is None:
+        return
+    update = {'$set': details}
+    db.leaderboard.update_many({'user_id': user_id}, update)
+    db.leaderboard_buckets.update_many({'user_id': user_id}, update)
+
+
+def propagate_team_name(team_id, team_name, db=None):
+    """Refresh ``team_name`` on every leaderboard copy belonging to a team"""
+    db = db if db is not None else get_db()
+    update = {'$set': {'team_name': team_name}}
+    db.leaderboard.update_many({'team_id': team_id}, update)
+    db.leaderboard_buckets.update_many({'team_id': team_id}, update)
+
+
+def stale_name_fixes(documents, details):
+    """
+    Compare leaderboard documents with current user details.
+
+    Returns UpdateOne operations for every document whose denormalized fields
+    differ; documents for users that no longer exist are left alone.
+    """
+    operations = []
+    for document in documents:
+        current = details.get(document.get('user_id'))
+        if current is None:
+            continue
+        changes = {
+            field: value for field, value in current.items()
+            if document.get(field) != value
+        }
+        if changes:
+            operations.append(UpdateOne({'_id': document['_id']}, {'$set': changes}))
+    return operations
+
+
+def verify_names(collection, fix=False, batch_size=1000, db=None):
+    """Scan a leaderboard collection in batches; returns (scanned, stale)"""
+    db = db if db is not None else get_db()
+    projection = {'user_id': 1, 'user_name': 1, 'team_id': 1, 'team_name': 1}
+    scanned = stale = 0
+    batch = []
+
+    def check(documents):
+        details = user_details({document.get('user_id') for document in documents}, db=db)
+        operations = stale_name_fixes(documents, details)
+        if fix and operations:
+            db[collection].bulk_write(operations, ordered=False)
+        return len(operations)
+
+    for document in db[collection].find({}, projection, batch_size=batch_size):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            stale += check(batch)
+            scanned += len(batch)
+            batch = []
+    if batch:
+        stale += check(batch)
+        scanned += len(batch)
+    return scanned, stale
+
+
+def competition_ranks(points):
+    """
+    Standard competition ranks ("1224") for points sorted highest first.
+
+    A rank is one more than the number of entries with strictly more points,
+    the same rule ``window_rank`` applies to a single user, so tied users share
+    a rank wherever they appear.
+    """
+    ranks = []
+    for index, value in enumerate(points):
+        ranks.append(ranks[-1] if index and value == points[index - 1] else index + 1)
+    return ranks
+
+
+def window_top(window, period, limit):
+    """Top ``limit`` buckets of a period, highest points first (ties by user_id)"""
+    return LeaderboardBucket.objects.filter(window=window, period=period).order_by('-total_points', 'user_id')[:limit]
+
+
+def window_rank(window, period, user_id):
+    """Return (bucket, rank) for a user within a period, or (None, None); see ``competition_ranks``"""
+    buckets = LeaderboardBucket.objects.filter(window=window, period=period)
+    bucket = buckets.filter(user_id=user_id).first()
+    if bucket is None:
+        return None, None
+    return bucket, buckets.filter(total_points__gt=bucket.total_points).count() + 1
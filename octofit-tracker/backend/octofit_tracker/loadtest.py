@@ -0,0 +1,256 @@
+"""
+HTTP load-test helpers used by `manage.py loadtest`.
+
+The client is a deliberately small asyncio HTTP/1.1 implementation on top of
+``asyncio.open_connection`` so the harness has no dependencies beyond the
+standard library. Every request opens its own connection with
+``Connection: close``, which keeps the parser trivial and matches how the
+development server handles connections.
+"""
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+from bson import ObjectId
+from django.contrib.auth.hashers import make_password
+
+from .mongo import get_db
+from .scoring import apply_score
+
+DEFAULT_ENDPOINTS = [
+    '/api/users/',
+    '/api/teams/',
+    '/api/activities/',
+    '/api/leaderboard/',
+    '/api/workouts/',
+]
+
+# Async (Motor) twins of the sync endpoints, see octofit_tracker/async_views.py
+ASYNC_ENDPOINTS = [
+    '/api/async/activities/',
+    '/api/async/leaderboard/',
+    '/api/async/workouts/',
+    '/api/async/teams/',
+]
+
+SEED_MARKER = 'loadtest'
+
+# Seconds a single request may take before it is counted as an error
+DEFAULT_TIMEOUT = 30.0
+
+ACTIVITY_TYPES = ['Running', 'Cycling', 'Swimming', 'Weightlifting', 'Yoga', 'Boxing', 'HIIT']
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def summarize(latencies, errors, elapsed, total_bytes):
+    """Build the per-run report entry (latencies in seconds, reported in ms)"""
+    latencies = sorted(latencies)
+    completed = len(latencies)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': completed + errors,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(completed / elapsed, 2) if elapsed else None,
+        'bytes_per_response': round(total_bytes / completed, 1) if completed else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+    }
+
+
+def parse_response(response):
+    """Split a raw HTTP response into (status, body); raises ValueError if malformed"""
+    head, _, body = response.partition(b'\r\n\r\n')
+    parts = head.split(b' ', 2)
+    if len(parts) < 2 or not parts[0].startswith(b'HTTP/'):
+        raise ValueError(f'Malformed status line {head[:80]!r}')
+    return int(parts[1]), body
+
+
+async def fetch(host, port, path, headers=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Issue a GET request and return (status, body_bytes).
+
+    Raises ``asyncio.TimeoutError`` if the whole exchange takes longer than
+    ``timeout`` seconds and ``ValueError`` for a malformed response.
+    """
+    async def exchange():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            lines = [f'GET {path} HTTP/1.1', f'Host: {host}:{port}', 'Connection: close']
+            lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    return parse_response(await asyncio.wait_for(exchange(), timeout))
+
+
+async def drive_endpoint(base_url, path, concurrency, total_requests, headers=None, timeout=DEFAULT_TIMEOUT):
+    """Run ``total_requests`` GETs against one path with ``concurrency`` workers"""
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    remaining = total_requests
+    latencies = []
+    counters = {'errors': 0, 'bytes': 0}
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status, body = await fetch(host, port, path, headers, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError):
+                # Refused, timed out or unparseable: counted, never fatal to the run
+                counters['errors'] += 1
+                continue
+            if status >= 400:
+                counters['errors'] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            counters['bytes'] += len(body)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, counters['errors'], elapsed, counters['bytes'])
+
+
+def run_suite(base_url, endpoints, concurrency_levels, requests_per_level, headers=None, warmup=5,
+              timeout=DEFAULT_TIMEOUT):
+    """Drive every endpoint at every concurrency level; returns the results dict"""
+    async def suite():
+        results = {}
+        for path in endpoints:
+            if warmup:
+                await drive_endpoint(base_url, path, 1, warmup, headers, timeout)
+            results[path] = {}
+            for concurrency in concurrency_levels:
+                results[path][str(concurrency)] = await drive_endpoint(
+                    base_url, path, concurrency, requests_per_level, headers, timeout
+                )
+        return results
+
+    return asyncio.run(suite())
+
+
+def start_inprocess_server():
+    """
+    Serve the Django WSGI application on an ephemeral localhost port.
+
+    Uses the same threaded server as `runserver`, so no external process is
+    needed. Returns (base_url, server); call ``server.shutdown()`` when done.
+    """
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler, allow_reuse_address=True)
+    server.daemon_threads = True
+    server.set_app(get_internal_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def clear_seed(db=None):
+    """Remove documents created by a previous seed run"""
+    db = db if db is not None else get_db()
+    for collection in ('users', 'teams', 'activities', 'leaderboard'):
+        db[collection].delete_many({SEED_MARKER: True})
+
+
+def seed_dataset(users, activities_per_user, teams=4, batch_size=1000, db=None, rng=None):
+    """
+    Bulk-insert a synthetic dataset tagged with ``loadtest: true``.
+
+    Returns a dict of collection name to inserted document count.
+    """
+    db = db if db is not None else get_db()
+    rng = rng or random.Random(42)
+    now = datetime.utcnow()
+
+    team_docs = [
+        {'_id': ObjectId(), 'name': f'Load Team {i}', 'description': 'Load test team', 'members': [],
+         'created_at': now, SEED_MARKER: True}
+        for i in range(teams)
+    ]
+    db.teams.insert_many(team_docs)
+
+    # Seeded accounts share one hash; hashing per user would dominate seeding time
+    password = make_password('loadtest')
+    user_docs = []
+    for i in range(users):
+        team = team_docs[i % teams]
+        user_docs.append({
+            '_id': ObjectId(), 'name': f'Load User {i}', 'email': f'user{i}@{SEED_MARKER}.octofit',
+            'password': password, 'team_id': str(team['_id']), 'created_at': now, SEED_MARKER: True,
+        })
+    for i in range(0, len(user_docs), batch_size):
+        db.users.insert_many(user_docs[i:i + batch_size], ordered=False)
+
+    activity_count = 0
+    leaderboard_docs = []
+    batch = []
+    for index, user in enumerate(user_docs):
+        total_calories = total_points = 0
+        for _ in range(activities_per_user):
+            activity_type = rng.choice(ACTIVITY_TYPES)
+            duration = rng.randint(20, 120)
+            calories = duration * rng.randint(5, 12)
+            activity = apply_score({
+                'user_id': str(user['_id']), 'activity_type': activity_type, 'duration': duration,
+                'distance': round(rng.uniform(2.0, 15.0), 2) if activity_type in ('Running', 'Cycling', 'Swimming') else None,
+                'calories': calories, 'date': now - timedelta(days=rng.randint(1, 60)),
+                'notes': 'load test', SEED_MARKER: True,
+            })
+            total_calories += calories
+            total_points += activity['points']
+            batch.append(activity)
+            if len(batch) >= batch_size:
+                db.activities.insert_many(batch, ordered=False)
+                activity_count += len(batch)
+                batch = []
+        team = team_docs[index % teams]
+        leaderboard_docs.append({
+            'user_id': str(user['_id']), 'user_name': user['name'],
+            'team_id': str(team['_id']), 'team_name': team['name'],
+            'total_points': total_points,
+            'total_activities': activities_per_user, 'total_calories': total_calories,
+            'last_updated': now, SEED_MARKER: True,
+        })
+    if batch:
+        db.activities.insert_many(batch, ordered=False)
+        activity_count += len(batch)
+    for i in range(0, len(leaderboard_docs), batch_size):
+        db.leaderboard.insert_many(leaderboard_docs[i:i + batch_size], ordered=False)
+
+    return {
+        'teams': len(team_docs),
+        'users': len(user_docs),
+        'activities': activity_count,
+        'leaderboard': len(leaderboard_docs),
+    }
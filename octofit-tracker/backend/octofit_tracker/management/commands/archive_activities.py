@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from octofit_tracker.archive import archive_activities, archive_cutoff
+from octofit_tracker.mongo import ensure_indexes
+
+
+class Command(BaseCommand):
+    help = 'Move old activities into per-month archive collections and fold them into rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ACTIVITY_ARCHIVE_AFTER_DAYS,
+            help='Archive activities older than this many days (rounded down to a month boundary)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ACTIVITY_ARCHIVE_BATCH_SIZE,
+            help='Documents copied/deleted per bulk_write call',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report how many activities would be archived per month',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(days=options['days'])
+        self.stdout.write(f'Archiving activities dated before {cutoff:%Y-%m-%d}...')
+
+        ensure_indexes()
+        summary = archive_activities(
+            cutoff=cutoff,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+
+        total = sum(count for _, count in summary)
+        if options['dry_run']:
+            for month, count in summary:
+                self.stdout.write(f'  {month}: {count} activities')
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {total} activities would be archived'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Archived {total} activities across {len(summary)} months'))
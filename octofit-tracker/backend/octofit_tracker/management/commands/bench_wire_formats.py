@@ -0,0 +1,77 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from octofit_tracker import compression
+from octofit_tracker.renderers import MessagePackRenderer, msgpack
+from octofit_tracker.views import ActivityViewSet, LeaderboardViewSet, TeamViewSet, UserViewSet, WorkoutViewSet
+
+VIEWSETS = {
+    '/api/users/': UserViewSet,
+    '/api/teams/': TeamViewSet,
+    '/api/activities/': ActivityViewSet,
+    '/api/leaderboard/': LeaderboardViewSet,
+    '/api/workouts/': WorkoutViewSet,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare response bytes and CPU per response across wire formats and compression encodings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Render/compress repetitions per measurement')
+        parser.add_argument('--output', default=None,
+                            help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        settings.THROTTLING = dict(settings.THROTTLING, ENABLED=False)
+        factory = APIRequestFactory()
+        config = compression.get_config()
+
+        formats = {
+            'json': lambda data: JSONRenderer().render(data, 'application/json'),
+            'json-indented': lambda data: JSONRenderer().render(data, 'application/json; indent=4'),
+        }
+        if msgpack is not None:
+            formats['msgpack'] = lambda data: MessagePackRenderer().render(data)
+        encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+
+        iterations = options['iterations']
+        results = {}
+        for path, viewset in VIEWSETS.items():
+            request = factory.get(path, HTTP_HOST='localhost')
+            data = viewset.as_view({'get': 'list'})(request).data
+            results[path] = {}
+            for format_name, render in formats.items():
+                started = time.process_time()
+                for _ in range(iterations):
+                    body = render(data)
+                render_us = (time.process_time() - started) / iterations * 1e6
+
+                for encoding in encodings:
+                    compress_us = 0.0
+                    payload = body
+                    if encoding != 'identity':
+                        started = time.process_time()
+                        for _ in range(iterations):
+                            payload = compression.compress(body, encoding, config)
+                        compress_us = (time.process_time() - started) / iterations * 1e6
+                    results[path][f'{format_name}+{encoding}'] = {
+                        'bytes': len(payload),
+                        'render_cpu_us': round(render_us, 1),
+                        'compress_cpu_us': round(compress_us, 1),
+                        'total_cpu_us': round(render_us + compress_us, 1),
+                    }
+
+        output = json.dumps({'iterations': iterations, 'compression': config, 'results': results},
+                            indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
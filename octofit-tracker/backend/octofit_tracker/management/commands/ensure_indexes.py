@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from octofit_tracker.mongo import ensure_indexes
+
+
+class Command(BaseCommand):
+    help = 'Create the MongoDB indexes the OctoFit Tracker API relies on'
+
+    def handle(self, *args, **options):
+        for collection, index_name in ensure_indexes():
+            self.stdout.write(f'  {collection}: {index_name}')
+        self.stdout.write(self.style.SUCCESS('Indexes are up to date'))
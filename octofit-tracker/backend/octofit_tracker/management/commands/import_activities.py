@@ -0,0 +1,137 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import BulkWriteError
+from octofit_tracker.archive import archive_activities, archive_cutoff
+from octofit_tracker.importer import (
+    FORMATS, chunked, detect_format, init_worker, normalize_chunk, open_source
+)
+from octofit_tracker.leaderboard import (
+    apply_increments, bucket_increments, leaderboard_increments, merge_increments
+)
+from octofit_tracker.mongo import get_db
+from octofit_tracker.scoring import apply_score, get_ruleset
+
+
+class Command(BaseCommand):
+    help = 'Stream-import activities from large CSV, NDJSON or GPX files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Input format (detected from the extension by default)')
+        parser.add_argument('--user', default=None,
+                            help='User id or email for rows without one (e.g. GPX files)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                            help='Processes used to normalize rows')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows per normalization task and per insert_many call')
+        parser.add_argument('--no-archive', action='store_true',
+                            help='Do not archive imported activities older than the archive cutoff')
+        parser.add_argument('--progress-every', type=float, default=5.0,
+                            help='Seconds between progress reports')
+
+    def handle(self, *args, **options):
+        db = get_db()
+        users = list(db.users.find({}, {'email': 1}))
+        user_ids = [str(user['_id']) for user in users]
+        user_ids_by_email = {user['email'].lower(): str(user['_id']) for user in users if user.get('email')}
+        default_user = options['user']
+        if default_user and '@' in default_user:
+            default_user = user_ids_by_email.get(default_user.lower())
+            if default_user is None:
+                raise CommandError(f'No user with email {options["user"]}')
+        elif default_user and default_user not in user_ids:
+            raise CommandError(f'No user with id {default_user}')
+
+        self.ruleset = get_ruleset()
+        self.stats = {'read': 0, 'inserted': 0, 'rejected': 0, 'failed': 0}
+        self.increments = {}
+        self.buckets = {}
+        self.oldest = None
+        self.started = self.last_report = time.monotonic()
+        self.progress_every = options['progress_every']
+
+        for path in options['paths']:
+            if not options['format']:
+                try:
+                    detect_format(path)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+
+        try:
+            self._import(db, options, user_ids_by_email, default_user, user_ids)
+        finally:
+            # Activities already inserted must reach the leaderboard even if the run stops part way
+            self.stdout.write('Updating leaderboard...')
+            updated = apply_increments(self.increments, self.buckets, db=db)
+
+        if not options['no_archive'] and self.oldest is not None and self.oldest < archive_cutoff():
+            self.stdout.write('Archiving imported history older than the archive cutoff...')
+            archive_activities(db=db, log=self.stdout.write)
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.stats["inserted"]} activities in {elapsed:.1f}s '
+            f'({self.stats["inserted"] / elapsed if elapsed else 0:.0f}/s); '
+            f'{self.stats["rejected"]} rows rejected, {self.stats["failed"]} writes failed, '
+            f'{updated} leaderboard entries updated'
+        ))
+
+    def _import(self, db, options, user_ids_by_email, default_user, user_ids):
+        workers = max(options['workers'], 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(user_ids_by_email, default_user, user_ids)) as pool:
+            for path in options['paths']:
+                file_format = options['format'] or detect_format(path)
+                self.stdout.write(f'Importing {path} ({file_format})...')
+                handle, rows = open_source(path, file_format)
+                with handle:
+                    pending = set()
+                    try:
+                        for chunk in chunked(rows, options['chunk_size']):
+                            self.stats['read'] += len(chunk)
+                            pending.add(pool.submit(normalize_chunk, chunk))
+                            # Bound in-flight chunks so the reader never races ahead of the writers
+                            if len(pending) >= workers * 2:
+                                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                                self._write_results(db, done)
+                    finally:
+                        # Chunks already normalized are written even if reading failed
+                        self._write_results(db, wait(pending).done)
+
+    def _write_results(self, db, futures):
+        for future in futures:
+            documents, rejected = future.result()
+            self.stats['rejected'] += rejected
+            if not documents:
+                continue
+            for document in documents:
+                apply_score(document, self.ruleset)
+            failed = set()
+            try:
+                db.activities.insert_many(documents, ordered=False)
+            except BulkWriteError as exc:
+                failed = {error['index'] for error in exc.details.get('writeErrors', [])}
+            written = [document for index, document in enumerate(documents) if index not in failed]
+            self.stats['failed'] += len(failed)
+            self.stats['inserted'] += len(written)
+            merge_increments(self.increments, leaderboard_increments(written))
+            merge_increments(self.buckets, bucket_increments(written))
+            oldest = min((document['date'] for document in written), default=None)
+            if oldest is not None and (self.oldest is None or oldest < self.oldest):
+                self.oldest = oldest
+        self._report_progress()
+
+    def _report_progress(self):
+        now = time.monotonic()
+        if now - self.last_report < self.progress_every:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        self.stdout.write(
+            f'  {self.stats["read"]} rows read, {self.stats["inserted"]} inserted '
+            f'({self.stats["inserted"] / elapsed:.0f}/s)'
+        )
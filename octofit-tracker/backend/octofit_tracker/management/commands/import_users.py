@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from octofit_tracker.importer import chunked, detect_format, open_source
+from octofit_tracker.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create users from a CSV or NDJSON file (name, email, password, team_id)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--format', choices=('csv', 'ndjson'), default=None,
+                            help='Input format (detected from the extension by default)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Users hashed and inserted per batch')
+
+    def handle(self, *args, **options):
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if file_format not in ('csv', 'ndjson'):
+            raise CommandError('Users can only be imported from CSV or NDJSON files')
+
+        started = time.monotonic()
+        created = rejected = 0
+        handle, rows = open_source(options['path'], file_format)
+        with handle:
+            for offset, batch in enumerate(chunked(rows, options['batch_size'])):
+                ids, errors = provision_users(batch)
+                created += len(ids)
+                rejected += len(errors)
+                for error in errors:
+                    row_number = offset * options['batch_size'] + error['index'] + 1
+                    self.stderr.write(f'  row {row_number} ({error["email"]}): {error["error"]}')
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'  {created} users created ({created / elapsed:.0f}/s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} users in {time.monotonic() - started:.1f}s; {rejected} rows rejected'
+        ))
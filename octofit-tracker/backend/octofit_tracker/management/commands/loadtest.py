@@ -0,0 +1,115 @@
+import json
+import platform
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from octofit_tracker.loadtest import (
+    ASYNC_ENDPOINTS, DEFAULT_ENDPOINTS, DEFAULT_TIMEOUT, clear_seed, run_suite, seed_dataset, start_inprocess_server
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset and drive the /api/* endpoints with an asyncio HTTP client, '
+        'reporting throughput and p50/p95/p99 latency per endpoint as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0,
+                            help='Seed this many users before running (0 = use existing data)')
+        parser.add_argument('--activities-per-user', type=int, default=20,
+                            help='Activities seeded per user')
+        parser.add_argument('--keep-seed', action='store_true',
+                            help='Leave seeded documents in place after the run')
+        parser.add_argument('--url', default=None,
+                            help='Base URL of a running server; by default an in-process server is started')
+        parser.add_argument('--endpoints', default=','.join(DEFAULT_ENDPOINTS),
+                            help='Comma-separated list of paths to drive')
+        parser.add_argument('--compare-async', action='store_true',
+                            help='Drive each async /api/async/* endpoint right after its sync twin; '
+                                 'requires --url pointing at an ASGI server (e.g. uvicorn octofit_tracker.asgi:application)')
+        parser.add_argument('--concurrency', default='1,8,32',
+                            help='Comma-separated concurrency levels')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint per concurrency level')
+        parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                            help='Seconds before a request is abandoned and counted as an error')
+        parser.add_argument('--keep-throttling', action='store_true',
+                            help='Leave API rate limiting on for the in-process server')
+        parser.add_argument('--header', action='append', default=[],
+                            help='Extra request header as "Name: value" (repeatable)')
+        parser.add_argument('--output', default=None,
+                            help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        try:
+            concurrency_levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be a comma-separated list of integers')
+        endpoints = [path.strip() for path in options['endpoints'].split(',') if path.strip()]
+        if options['compare_async']:
+            if not options['url']:
+                # The in-process server is WSGI, where the async views are refused
+                raise CommandError('--compare-async needs --url pointing at an ASGI server '
+                                   '(e.g. uvicorn octofit_tracker.asgi:application)')
+            paired = []
+            for path in endpoints:
+                paired.append(path)
+                twin = path.replace('/api/', '/api/async/', 1)
+                if twin in ASYNC_ENDPOINTS:
+                    paired.append(twin)
+            endpoints = paired
+        headers = {}
+        for header in options['header']:
+            name, sep, value = header.partition(':')
+            if not sep:
+                raise CommandError(f'Invalid header "{header}", expected "Name: value"')
+            headers[name.strip()] = value.strip()
+
+        seeded = None
+        if options['users']:
+            self.stderr.write('Seeding load test dataset...')
+            clear_seed()
+            seeded = seed_dataset(options['users'], options['activities_per_user'])
+            self.stderr.write(self.style.SUCCESS(f'Seeded {seeded}'))
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            if not options['keep_throttling']:
+                # A single load-generating client would otherwise be rate limited
+                settings.THROTTLING = dict(settings.THROTTLING, ENABLED=False)
+            base_url, server = start_inprocess_server()
+            self.stderr.write(f'Started in-process server at {base_url}')
+
+        try:
+            results = run_suite(
+                base_url, endpoints, concurrency_levels, options['requests'], headers, timeout=options['timeout']
+            )
+        finally:
+            if server is not None:
+                server.shutdown()
+            if seeded and not options['keep_seed']:
+                clear_seed()
+
+        report = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'base_url': base_url,
+                'in_process': server is not None,
+                'python': platform.python_version(),
+                'requests_per_level': options['requests'],
+                'concurrency_levels': concurrency_levels,
+                'headers': headers,
+                'seeded': seeded,
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
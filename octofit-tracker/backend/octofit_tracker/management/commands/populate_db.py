@@ -1,5 +1,8 @@
 from django.core.management.base import BaseCommand
-from octofit_tracker.models import User, Team, Activity, Leaderboard, Workout
+from octofit_tracker.models import User, Team, Activity, ActivityRollup, Leaderboard, LeaderboardBucket, Workout
+from octofit_tracker.hashing import hash_passwords
+from octofit_tracker.leaderboard import rebuild_buckets
+from octofit_tracker.scoring import apply_score
 from datetime import datetime, timedelta
 import random
 
@@ -16,6 +19,8 @@ class Command(BaseCommand):
         Team.objects.all().delete()
         Activity.objects.all().delete()
         Leaderboard.objects.all().delete()
+        LeaderboardBucket.objects.all().delete()
+        ActivityRollup.objects.all().delete()
         Workout.objects.all().delete()
         self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
 
@@ -106,11 +111,13 @@ class Command(BaseCommand):
 
         created_users = []
         user_team_map = {}  # Map user to their team object
-        for user_data in marvel_users + dc_users:
+        all_users = marvel_users + dc_users
+        hashed_passwords = hash_passwords([user_data['password'] for user_data in all_users])
+        for user_data, password in zip(all_users, hashed_passwords):
             user = User.objects.create(
                 name=user_data['name'],
                 email=user_data['email'],
-                password=user_data['password'],
+                password=password,
                 team_id=str(user_data['team']._id)
             )
             created_users.append(user)
@@ -131,15 +138,15 @@ class Command(BaseCommand):
                 distance = round(random.uniform(2.0, 15.0), 2) if activity_type in ['Running', 'Cycling', 'Swimming'] else None
                 calories = duration * random.randint(5, 12)
                 
-                Activity.objects.create(
-                    user_id=str(user._id),
-                    activity_type=activity_type,
-                    duration=duration,
-                    distance=distance,
-                    calories=calories,
-                    date=datetime.now() - timedelta(days=days_ago),
-                    notes=f'{activity_type} session by {user.name}'
-                )
+                Activity.objects.create(**apply_score({
+                    'user_id': str(user._id),
+                    'activity_type': activity_type,
+                    'duration': duration,
+                    'distance': distance,
+                    'calories': calories,
+                    'date': datetime.now() - timedelta(days=days_ago),
+                    'notes': f'{activity_type} session by {user.name}'
+                }))
         
         activity_count = Activity.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Created {activity_count} activities'))
@@ -149,7 +156,7 @@ class Command(BaseCommand):
         for user in created_users:
             user_activities = Activity.objects.filter(user_id=str(user._id))
             total_calories = sum(activity.calories for activity in user_activities)
-            total_points = total_calories + (user_activities.count() * 100)
+            total_points = sum(activity.points for activity in user_activities)
             
             team = user_team_map[str(user._id)]
             
@@ -166,6 +173,11 @@ class Command(BaseCommand):
         leaderboard_count = Leaderboard.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Created {leaderboard_count} leaderboard entries'))
 
+        # Daily, weekly and monthly leaderboard windows
+        self.stdout.write('Rebuilding leaderboard windows...')
+        bucket_count = rebuild_buckets()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {bucket_count} leaderboard window buckets'))
+
         # Create Workout suggestions
         self.stdout.write('Creating workout suggestions...')
         workouts = [
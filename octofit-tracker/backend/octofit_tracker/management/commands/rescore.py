@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from octofit_tracker.archive import archive_collection_name, archived_months, refresh_month_rollups
+from octofit_tracker.leaderboard import rebuild_buckets, rebuild_totals
+from octofit_tracker.mongo import get_db
+from octofit_tracker.scoring import get_ruleset, rescore_collection
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored activity points under a scoring rule set and rebuild leaderboard totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--version', dest='ruleset_version', type=int, default=None,
+                            help='Rule set version to apply (defaults to SCORING_RULESET_VERSION)')
+        parser.add_argument('--all', action='store_true',
+                            help='Rescore every activity, not only those scored with another version')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Activities scored per NumPy batch / bulk_write')
+        parser.add_argument('--skip-archive', action='store_true',
+                            help='Leave archived activities and their rollups untouched')
+
+    def handle(self, *args, **options):
+        try:
+            ruleset = get_ruleset(options['ruleset_version'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        db = get_db()
+        query = {} if options['all'] else {'scoring_version': {'$ne': ruleset.version}}
+        started = time.monotonic()
+
+        def progress(scanned, changed):
+            rate = scanned / (time.monotonic() - started)
+            self.stdout.write(f'  {scanned} scanned, {changed} changed ({rate:.0f}/s)')
+
+        self.stdout.write(f'Rescoring activities with rule set v{ruleset.version}...')
+        scanned, changed = rescore_collection(db.activities, ruleset, query, options['batch_size'], progress)
+
+        if not options['skip_archive']:
+            for year, month in archived_months(db):
+                archive = db[archive_collection_name(year, month)]
+                month_scanned, month_changed = rescore_collection(archive, ruleset, query, options['batch_size'])
+                scanned += month_scanned
+                changed += month_changed
+                if month_changed:
+                    refresh_month_rollups(db, year, month)
+                    self.stdout.write(f'  Archive {year:04d}-{month:02d}: {month_changed} changed')
+
+        self.stdout.write('Rebuilding leaderboard totals and windowed buckets...')
+        users = rebuild_totals(db=db)
+        buckets = rebuild_buckets(db=db)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rescored {scanned} activities ({changed} changed) in {elapsed:.1f}s; '
+            f'rebuilt {users} leaderboard entries and {buckets} buckets'
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from octofit_tracker.leaderboard import verify_names
+
+
+class Command(BaseCommand):
+    help = 'Find (and optionally fix) leaderboard entries with stale user or team names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite stale entries')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Leaderboard documents checked per batch')
+
+    def handle(self, *args, **options):
+        for collection in ('leaderboard', 'leaderboard_buckets'):
+            scanned, stale = verify_names(collection, fix=options['fix'], batch_size=options['batch_size'])
+            action = 'fixed' if options['fix'] else 'stale'
+            style = self.style.SUCCESS if not stale or options['fix'] else self.style.WARNING
+            self.stdout.write(style(f'{collection}: {scanned} checked, {stale} {action}'))
@@ -0,0 +1,452 @@
+"""
+Prometheus-style metrics for OctoFit Tracker.
+
+Request latency per view and viewset action, serializer and render time,
+MongoDB command time and connection pool activity, and cache hits/misses are
+recorded into an in-process ``Registry`` and exposed in the Prometheus text
+format at ``/metrics``.
+
+Recording is lock-light: samples live in ``SHARDS`` independently locked dicts
+picked by thread id, so concurrent requests rarely contend and each update is
+a dict lookup and an addition. With several worker processes (gunicorn,
+uvicorn ``--workers``) set ``METRICS['DIRECTORY']``: each worker then writes a
+snapshot file there every ``FLUSH_INTERVAL`` seconds and a scrape of any worker
+merges all files. Counters and histograms of exited workers are kept so totals
+never go backwards; gauges are only taken from snapshots newer than
+``STALE_AFTER`` seconds. Clear the directory when deploying.
+"""
+import asyncio
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.deprecation import MiddlewareMixin
+from pymongo import monitoring
+from rest_framework import serializers
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help)
+METRICS = {
+    'octofit_http_requests_total': (
+        'counter', 'HTTP responses by view, action, method and status class'),
+    'octofit_http_request_duration_seconds': (
+        'histogram', 'Time from entering to leaving the middleware stack'),
+    'octofit_serialize_duration_seconds': (
+        'histogram', 'Time spent evaluating serializer.data in views (includes lazy queryset fetches)'),
+    'octofit_render_duration_seconds': (
+        'histogram', 'Time spent rendering already serialized DRF responses (JSON/MessagePack encoding)'),
+    'octofit_mongodb_command_duration_seconds': (
+        'histogram', 'MongoDB command round-trip time by command name'),
+    'octofit_mongodb_command_failures_total': (
+        'counter', 'MongoDB commands that returned an error'),
+    'octofit_mongodb_pool_checkouts_total': (
+        'counter', 'Connections checked out of the pymongo pool'),
+    'octofit_mongodb_pool_checkout_failures_total': (
+        'counter', 'Failed pool checkouts by reason (e.g. timeout waiting for a connection)'),
+    'octofit_mongodb_pool_checkout_wait_seconds': (
+        'histogram', 'Time spent waiting to check a connection out of the pool'),
+    'octofit_mongodb_pool_connections': (
+        'gauge', 'Open connections in the pymongo pool'),
+    'octofit_mongodb_pool_checked_out': (
+        'gauge', 'Connections currently checked out of the pymongo pool'),
+    'octofit_cache_requests_total': (
+        'counter', 'Application cache lookups by cache and result'),
+    'octofit_cache_hit_ratio': (
+        'gauge', 'Share of application cache lookups that were hits'),
+}
+
+
+def get_config():
+    config = {
+        'ENABLED': True,
+        'DIRECTORY': None,
+        'FLUSH_INTERVAL': 5.0,
+        'STALE_AFTER': 60.0,
+        'SHARDS': 16,
+        'BUCKETS': DEFAULT_BUCKETS,
+        'TOKEN': None,
+    }
+    config.update(getattr(settings, 'METRICS', {}))
+    return config
+
+
+def label_key(**labels):
+    """Hashable, order-independent label set"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Registry:
+    """Counters, gauges and histograms split across independently locked shards"""
+
+    def __init__(self, shards=16, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.pid = os.getpid()
+        self.worker_id = f'{self.pid}-{uuid.uuid4().hex[:8]}'
+
+    def _shard(self):
+        return self.shards[threading.get_ident() % len(self.shards)]
+
+    def inc(self, name, labels=(), value=1):
+        """Add ``value`` to a counter or gauge (negative values for gauges)"""
+        samples, lock = self._shard()
+        key = (name, labels)
+        with lock:
+            samples[key] = samples.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Record one histogram observation"""
+        samples, lock = self._shard()
+        key = (name, labels)
+        index = bisect_left(self.buckets, value)
+        with lock:
+            counts = samples.get(key)
+            if counts is None:
+                # One slot per bucket, one for +Inf, then the running sum
+                counts = samples[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        """Merged copy of every shard as {(name, labels): value}"""
+        merged = {}
+        for samples, lock in self.shards:
+            with lock:
+                items = [(key, list(value) if isinstance(value, list) else value) for key, value in samples.items()]
+            for key, value in items:
+                merge_sample(merged, key, value)
+        return merged
+
+
+def merge_sample(into, key, value):
+    current = into.get(key)
+    if current is None:
+        into[key] = value
+    elif isinstance(current, list):
+        into[key] = [a + b for a, b in zip(current, value)]
+    else:
+        into[key] = current + value
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return this process's registry, starting a fresh one after a fork"""
+    global _registry
+    registry = _registry
+    if registry is None or registry.pid != os.getpid():
+        with _registry_lock:
+            registry = _registry
+            if registry is None or registry.pid != os.getpid():
+                config = get_config()
+                registry = Registry(config['SHARDS'], config['BUCKETS'])
+                if config['DIRECTORY']:
+                    start_flusher(registry, config)
+                _registry = registry
+    return registry
+
+
+def write_snapshot(registry, directory):
+    """Atomically write this worker's samples to ``directory``"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f'{registry.worker_id}.json'
+    # Per-thread temporary name: the flusher and a scrape may write at once
+    temporary = directory / f'{registry.worker_id}.{threading.get_ident()}.tmp'
+    samples = [[name, labels, value] for (name, labels), value in registry.snapshot().items()]
+    temporary.write_text(json.dumps({'buckets': registry.buckets, 'samples': samples}))
+    os.replace(temporary, target)
+
+
+def start_flusher(registry, config):
+    def flush_forever():
+        while registry.pid == os.getpid():
+            time.sleep(config['FLUSH_INTERVAL'])
+            try:
+                write_snapshot(registry, config['DIRECTORY'])
+            except OSError:
+                pass
+
+    threading.Thread(target=flush_forever, name='octofit-metrics', daemon=True).start()
+    atexit.register(write_snapshot, registry, config['DIRECTORY'])
+
+
+def read_snapshots(directory, buckets, stale_after, now=None):
+    """Merge every worker snapshot in ``directory``; stale files contribute no gauges"""
+    now = time.time() if now is None else now
+    merged = {}
+    for path in Path(directory).glob('*.json'):
+        try:
+            fresh = now - path.stat().st_mtime <= stale_after
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if tuple(data.get('buckets', ())) != tuple(buckets):
+            continue
+        for name, labels, value in data['samples']:
+            if not fresh and METRICS.get(name, ('gauge',))[0] == 'gauge':
+                continue
+            merge_sample(merged, (name, tuple(tuple(pair) for pair in labels)), value)
+    return merged
+
+
+def collect(config=None):
+    """All samples to expose: this process alone, or every worker's snapshot"""
+    config = config or get_config()
+    registry = get_registry()
+    if not config['DIRECTORY']:
+        return registry.snapshot()
+    write_snapshot(registry, config['DIRECTORY'])
+    return read_snapshots(config['DIRECTORY'], registry.buckets, config['STALE_AFTER'])
+
+
+def cache_hit_ratios(samples):
+    totals = {}
+    for (name, labels), value in samples.items():
+        if name == 'octofit_cache_requests_total':
+            labels = dict(labels)
+            hits, lookups = totals.get(labels['cache'], (0, 0))
+            totals[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), lookups + value)
+    return {
+        ('octofit_cache_hit_ratio', label_key(cache=cache)): hits / lookups
+        for cache, (hits, lookups) in totals.items() if lookups
+    }
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(samples, buckets):
+    """Prometheus text exposition (format 0.0.4) of merged samples"""
+    samples = dict(samples)
+    samples.update(cache_hit_ratios(samples))
+    by_name = {}
+    for (name, labels), value in sorted(samples.items()):
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, entries in by_name.items():
+        kind, description = METRICS.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in entries:
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", _number(float(bound)))])} {cumulative}')
+            cumulative += value[len(buckets)]
+            lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(float(value[-1]))}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def record_cache(cache, hit):
+    """Count one lookup in a named application cache"""
+    get_registry().inc('octofit_cache_requests_total', label_key(cache=cache, result='hit' if hit else 'miss'))
+
+
+def _view_labels(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return label_key(view='unmatched', action='', method=request.method)
+    action = getattr(match.func, 'actions', {}).get(request.method.lower(), '')
+    return label_key(view=match.view_name or match.route, action=action, method=request.method)
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Record request latency and DRF render time per view and action"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = get_config()['ENABLED']
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, duration):
+        registry = get_registry()
+        labels = _view_labels(request)
+        registry.observe('octofit_http_request_duration_seconds', labels, duration)
+        status = f'{response.status_code // 100}xx'
+        registry.inc('octofit_http_requests_total', labels + (('status', status),))
+
+    def process_template_response(self, request, response):
+        # Runs just before DRF renders; the callback fires once rendering is done
+        if self.enabled:
+            started = time.perf_counter()
+
+            def rendered(response):
+                get_registry().observe(
+                    'octofit_render_duration_seconds', _view_labels(request), time.perf_counter() - started
+                )
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class TimedSerializerMixin:
+    """Record how long a view's top-level ``serializer.data`` takes to evaluate"""
+
+    @property
+    def data(self):
+        evaluated = hasattr(self, '_data')
+        started = time.perf_counter()
+        data = super().data
+        # Nested and context-less serializers are part of their parent's time;
+        # later accesses reuse the cached representation and are not counted
+        request = self.context.get('request') if self.parent is None else None
+        if request is not None and not evaluated:
+            get_registry().observe(
+                'octofit_serialize_duration_seconds', _view_labels(request), time.perf_counter() - started
+            )
+        return data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """``many=True`` counterpart of ``TimedSerializerMixin`` (set as Meta.list_serializer_class)"""
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Time every MongoDB command issued by any client in the process"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        get_registry().observe(
+            'octofit_mongodb_command_duration_seconds', label_key(command=event.command_name),
+            event.duration_micros / 1e6,
+        )
+
+    def failed(self, event):
+        registry = get_registry()
+        labels = label_key(command=event.command_name)
+        registry.observe('octofit_mongodb_command_duration_seconds', labels, event.duration_micros / 1e6)
+        registry.inc('octofit_mongodb_command_failures_total', labels)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Track pool size, checkouts and checkout waits per server address"""
+
+    def __init__(self):
+        self.waiting = threading.local()
+
+    @staticmethod
+    def _labels(event):
+        host, port = event.address
+        return label_key(address=f'{host}:{port}')
+
+    def _waited(self, event):
+        started = getattr(self.waiting, 'started', None)
+        self.waiting.started = None
+        if started is not None:
+            get_registry().observe(
+                'octofit_mongodb_pool_checkout_wait_seconds', self._labels(event), time.perf_counter() - started
+            )
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        get_registry().inc('octofit_mongodb_pool_connections', self._labels(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        get_registry().inc('octofit_mongodb_pool_connections', self._labels(event), -1)
+
+    def connection_check_out_started(self, event):
+        self.waiting.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._waited(event)
+        get_registry().inc(
+            'octofit_mongodb_pool_checkout_failures_total', self._labels(event) + (('reason', str(event.reason)),)
+        )
+
+    def connection_checked_out(self, event):
+        self._waited(event)
+        registry = get_registry()
+        registry.inc('octofit_mongodb_pool_checkouts_total', self._labels(event))
+        registry.inc('octofit_mongodb_pool_checked_out', self._labels(event))
+
+    def connection_checked_in(self, event):
+        get_registry().inc('octofit_mongodb_pool_checked_out', self._labels(event), -1)
+
+
+def register_listeners():
+    """Install the pymongo listeners process-wide; call before any client is created"""
+    monitoring.register(CommandMetrics())
+    monitoring.register(PoolMetrics())
+
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint
+
+    With ``TOKEN`` set a matching ``Authorization: Bearer`` header is required.
+    Without one, only loopback clients are answered unless ``DEBUG`` is on.
+    """
+    config = get_config()
+    if not config['ENABLED']:
+        raise Http404
+    if config['TOKEN']:
+        supplied = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(supplied.encode(), f'Bearer {config["TOKEN"]}'.encode()):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG and request.META.get('REMOTE_ADDR') not in LOOPBACK_ADDRESSES:
+        return HttpResponseForbidden()
+    body = render(collect(config), get_registry().buckets)
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -43,6 +43,8 @@ class Activity(djongo_models.Model):
     calories = models.IntegerField()
     date = models.DateTimeField()
     notes = models.TextField(blank=True, null=True)
+    points = models.IntegerField(default=0)
+    scoring_version = models.IntegerField(default=0)
     
     class Meta:
         db_table = 'activities'
@@ -51,6 +53,24 @@ class Activity(djongo_models.Model):
         return f"{self.activity_type} - {self.duration} mins"
 
 
+class ActivityRollup(djongo_models.Model):
+    """Per-user monthly totals for archived activities"""
+    _id = djongo_models.ObjectIdField(primary_key=True)
+    user_id = models.CharField(max_length=100)
+    month = models.CharField(max_length=7)  # YYYY-MM
+    total_activities = models.IntegerField(default=0)
+    total_points = models.IntegerField(default=0)
+    total_calories = models.IntegerField(default=0)
+    total_duration = models.IntegerField(default=0)
+    total_distance = models.FloatField(default=0)
+    
+    class Meta:
+        db_table = 'activity_rollups'
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.month}"
+
+
 class Leaderboard(djongo_models.Model):
     """Leaderboard model for OctoFit Tracker"""
     _id = djongo_models.ObjectIdField(primary_key=True)
@@ -70,6 +90,28 @@ class Leaderboard(djongo_models.Model):
         return f"{self.user_name} - {self.total_points} points"
 
 
+class LeaderboardBucket(djongo_models.Model):
+    """Per-period leaderboard totals (daily/weekly/monthly windows)"""
+    _id = djongo_models.ObjectIdField(primary_key=True)
+    window = models.CharField(max_length=10)  # day, week or month
+    period = models.CharField(max_length=10)  # e.g. 2026-10-19, 2026-W42, 2026-10
+    user_id = models.CharField(max_length=100)
+    user_name = models.CharField(max_length=200)
+    team_id = models.CharField(max_length=100, blank=True, null=True)
+    team_name = models.CharField(max_length=200, blank=True, null=True)
+    total_points = models.IntegerField(default=0)
+    total_activities = models.IntegerField(default=0)
+    total_calories = models.IntegerField(default=0)
+    expires_at = models.DateTimeField()
+    last_updated = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'leaderboard_buckets'
+    
+    def __str__(self):
+        return f"{self.user_name} - {self.window} {self.period} - {self.total_points} points"
+
+
 class Workout(djongo_models.Model):
     """Workout suggestion model for OctoFit Tracker"""
     _id = djongo_models.ObjectIdField(primary_key=True)
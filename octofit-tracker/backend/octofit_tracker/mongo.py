@@ -0,0 +1,121 @@
+"""
+Direct pymongo access for OctoFit Tracker.
+
+The ORM (djongo) is fine for per-object CRUD, but bulk maintenance work such as
+archiving, rollups and batched leaderboard updates is far cheaper when issued as
+native MongoDB operations. This module hands out a single, process-wide
+``MongoClient`` built from ``settings.DATABASES['default']`` so those code paths
+share one connection pool regardless of which thread they run on.
+"""
+import threading
+
+from django.conf import settings
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+_client = None
+_client_lock = threading.Lock()
+
+# Indexes the application relies on, keyed by collection name.
+# Each entry is (keys, options) as accepted by ``Collection.create_index``.
+INDEXES = {
+    'users': [
+        ([('email', ASCENDING)], {'name': 'email_unique', 'unique': True}),
+    ],
+    'activities': [
+        ([('date', DESCENDING)], {'name': 'date_desc'}),
+        ([('user_id', ASCENDING), ('date', DESCENDING)], {'name': 'user_date'}),
+    ],
+    'leaderboard': [
+        # Unique so concurrent upserts for a new user cannot create two rows
+        ([('user_id', ASCENDING)], {'name': 'user_id_unique', 'unique': True}),
+        ([('team_id', ASCENDING)], {'name': 'team_id'}),
+        # All-time top-K (dashboard) sorted by points with user_id breaking ties
+        ([('total_points', DESCENDING), ('user_id', ASCENDING)], {'name': 'points_user'}),
+    ],
+    'leaderboard_buckets': [
+        ([('window', ASCENDING), ('period', ASCENDING), ('user_id', ASCENDING)],
+         {'name': 'window_period_user', 'unique': True}),
+        # user_id last so window_top's tie-break is served by the index, not an in-memory sort
+        ([('window', ASCENDING), ('period', ASCENDING), ('total_points', DESCENDING), ('user_id', ASCENDING)],
+         {'name': 'window_period_points_user'}),
+        ([('expires_at', ASCENDING)], {'name': 'expires_at_ttl', 'expireAfterSeconds': 0}),
+        ([('user_id', ASCENDING)], {'name': 'user_id'}),
+        ([('team_id', ASCENDING)], {'name': 'team_id'}),
+    ],
+    'activity_rollups': [
+        ([('user_id', ASCENDING), ('month', ASCENDING)], {'name': 'user_month', 'unique': True}),
+    ],
+}
+
+
+# Indexes superseded by an entry in INDEXES, dropped by ``ensure_indexes``
+REPLACED_INDEXES = {
+    'leaderboard': ['user_id'],
+    'leaderboard_buckets': ['window_period_points'],
+}
+
+
+def get_client():
+    """Return the shared MongoClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client_settings = dict(settings.DATABASES['default'].get('CLIENT', {}))
+                _client = MongoClient(**client_settings)
+    return _client
+
+
+def get_db():
+    """Return the pymongo Database configured for the default connection"""
+    return get_client()[settings.DATABASES['default']['NAME']]
+
+
+def ensure_indexes(db=None):
+    """Create every index listed in INDEXES (no-op for existing ones)"""
+    db = db if db is not None else get_db()
+    for collection_name, names in REPLACED_INDEXES.items():
+        existing = db[collection_name].index_information()
+        for name in names:
+            if name in existing:
+                db[collection_name].drop_index(name)
+    merge_duplicate_leaderboard_rows(db)
+    created = []
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for keys, options in indexes:
+            created.append((collection_name, collection.create_index(keys, **options)))
+    return created
+
+
+def merge_duplicate_leaderboard_rows(db=None):
+    """
+    Fold leaderboard rows sharing a user_id into one so the unique index can be built.
+
+    Duplicates were created by racing upserts, each receiving part of the
+    user's increments, so their totals are summed into the oldest row.
+    """
+    db = db if db is not None else get_db()
+    pipeline = [
+        {'$sort': {'_id': ASCENDING}},
+        {'$group': {
+            '_id': '$user_id',
+            'ids': {'$push': '$_id'},
+            'total_points': {'$sum': '$total_points'},
+            'total_activities': {'$sum': '$total_activities'},
+            'total_calories': {'$sum': '$total_calories'},
+            'count': {'$sum': 1},
+        }},
+        {'$match': {'count': {'$gt': 1}}},
+    ]
+    merged = 0
+    for row in db.leaderboard.aggregate(pipeline, allowDiskUse=True):
+        keep, duplicates = row['ids'][0], row['ids'][1:]
+        db.leaderboard.update_one({'_id': keep}, {'$set': {
+            'total_points': row['total_points'],
+            'total_activities': row['total_activities'],
+            'total_calories': row['total_calories'],
+        }})
+        db.leaderboard.delete_many({'_id': {'$in': duplicates}})
+        merged += len(duplicates)
+    return merged
@@ -0,0 +1,209 @@
+"""
+On-demand per-request profiling.
+
+``RequestProfilingMiddleware`` runs a request under ``cProfile`` when either the
+``X-Profile-Token`` header matches ``REQUEST_PROFILING['TOKEN']`` or the request
+is picked by the ``SAMPLE_RATE`` lottery. Each profile is reduced to its top
+frames and stored as a small JSON file in ``REQUEST_PROFILING['DIRECTORY']``;
+only the newest ``MAX_PROFILES`` files are kept. Stored profiles are listed at
+the admin-only ``/api/profiles/`` endpoint.
+"""
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+
+
+def get_config():
+    config = {
+        'SAMPLE_RATE': 0.0,
+        'TOKEN': None,
+        'DIRECTORY': Path(settings.BASE_DIR) / 'profiles',
+        'MAX_PROFILES': 200,
+        'TOP_FRAMES': 30,
+    }
+    config.update(getattr(settings, 'REQUEST_PROFILING', {}))
+    return config
+
+
+def _frame_label(func):
+    filename, line, name = func
+    return f'{filename}:{line}({name})' if line else name
+
+
+def top_frames(profiler, limit):
+    """Return the ``limit`` most expensive frames by cumulative time"""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for func, (primitive_calls, total_calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': _frame_label(func),
+            'ncalls': total_calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:limit]
+
+
+def save_profile(directory, record, max_profiles):
+    """Atomically write a profile record and drop the oldest beyond the cap"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f'{record["id"]}.json'
+    temporary = target.with_suffix('.tmp')
+    temporary.write_text(json.dumps(record))
+    os.replace(temporary, target)
+
+    stored = sorted(directory.glob('*.json'))
+    for stale in stored[:max(len(stored) - max_profiles, 0)]:
+        try:
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def load_profiles(directory=None):
+    """Return stored profile records, newest first"""
+    directory = Path(directory or get_config()['DIRECTORY'])
+    if not directory.is_dir():
+        return []
+    records = []
+    for path in sorted(directory.glob('*.json'), reverse=True):
+        try:
+            records.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return records
+
+
+def load_profile(profile_id, directory=None):
+    """Return one stored profile record or None"""
+    directory = Path(directory or get_config()['DIRECTORY'])
+    path = directory / f'{Path(profile_id).name}.json'
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _enable(profiler):
+    """Enable ``profiler`` on the current thread; False if one is already active"""
+    try:
+        profiler.enable()
+    except ValueError:
+        return False
+    return True
+
+
+async def _on_loop(func, *args):
+    return func(*args)
+
+
+def _on_request_thread(func, *args):
+    # Under ASGI every thread_sensitive call of a request runs on one worker thread
+    return sync_to_async(func, thread_sensitive=True)(*args)
+
+
+def is_coroutine_view(request):
+    """Whether the request resolves to an ``async def`` view"""
+    try:
+        match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    except Resolver404:
+        return False
+    return asyncio.iscoroutinefunction(match.func)
+
+
+class RequestProfilingMiddleware(MiddlewareMixin):
+    """
+    Profile opted-in or sampled requests with cProfile
+
+    cProfile only sees the thread it is enabled on. Under WSGI that is the
+    request's thread. Under ASGI, Django runs sync views, middleware and
+    rendering on the request's thread-sensitive worker thread, so the profiler
+    is enabled there; only requests routed to coroutine views are profiled on
+    the event loop, where other concurrent requests can show up as well.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.config = get_config()
+
+    def should_profile(self, request):
+        token = self.config['TOKEN']
+        supplied = request.META.get(PROFILE_HEADER)
+        if token and supplied and hmac.compare_digest(supplied, token):
+            return 'header'
+        rate = self.config['SAMPLE_RATE']
+        if rate and random.random() < rate:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = self.should_profile(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        if not _enable(profiler):
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.finish(request, response, profiler, trigger, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        trigger = self.should_profile(request)
+        if trigger is None:
+            return await self.get_response(request)
+
+        profiler = cProfile.Profile()
+        run = _on_loop if is_coroutine_view(request) else _on_request_thread
+        started = time.perf_counter()
+        if not await run(_enable, profiler):
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await run(profiler.disable)
+        return self.finish(request, response, profiler, trigger, time.perf_counter() - started)
+
+    def finish(self, request, response, profiler, trigger, duration):
+        """Store the profile and tag the response with its id"""
+        # Sortable by name: time prefix keeps rotation and listing chronological
+        profile_id = f'{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+        record = {
+            'id': profile_id,
+            'created': time.time(),
+            'trigger': trigger,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'frames': top_frames(profiler, self.config['TOP_FRAMES']),
+        }
+        try:
+            save_profile(self.config['DIRECTORY'], record, self.config['MAX_PROFILES'])
+        except OSError:
+            return response
+        response['X-Profile-Id'] = profile_id
+        return response
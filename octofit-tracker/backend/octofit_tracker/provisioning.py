@@ -0,0 +1,92 @@
+"""
+Bulk user provisioning shared by `/api/users/bulk/` and `manage.py import_users`.
+
+Rows are validated field by field, checked against existing emails with one
+``$in`` query per batch, hashed in parallel through ``hashing.hash_passwords``
+and written with a single unordered ``insert_many``.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.utils import timezone
+from pymongo.errors import BulkWriteError
+
+from .hashing import hash_passwords
+from .mongo import get_db
+
+
+STRING_FIELDS = ('name', 'email', 'password', 'team_id')
+
+
+def clean_row(row):
+    """Validate one input row; returns (document, error message)"""
+    if not isinstance(row, dict):
+        return None, 'each row must be an object'
+    for field in STRING_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return None, f'{field} must be a string'
+    name = (row.get('name') or '').strip()
+    email = (row.get('email') or '').strip().lower()
+    password = row.get('password') or ''
+    if not name:
+        return None, 'name is required'
+    try:
+        validate_email(email)
+    except DjangoValidationError:
+        return None, 'a valid email is required'
+    if not password:
+        return None, 'password is required'
+    team_id = row.get('team_id') or None
+    return {'name': name, 'email': email, 'password': password, 'team_id': team_id}, None
+
+
+def provision_users(rows, db=None):
+    """
+    Create users from ``rows`` (dicts with name, email, password, team_id).
+
+    Returns (created_ids, errors) where errors is a list of
+    ``{'index': ..., 'email': ..., 'error': ...}`` for rejected rows.
+    """
+    db = db if db is not None else get_db()
+    documents, indexes, errors = [], [], []
+    seen = set()
+    for index, row in enumerate(rows):
+        document, error = clean_row(row)
+        if document is not None and document['email'] in seen:
+            error = 'duplicate email in request'
+        if error:
+            email = row.get('email') if isinstance(row, dict) else None
+            errors.append({'index': index, 'email': email, 'error': error})
+            continue
+        seen.add(document['email'])
+        documents.append(document)
+        indexes.append(index)
+
+    existing = {user['email'] for user in db.users.find({'email': {'$in': list(seen)}}, {'email': 1})}
+    kept, kept_indexes = [], []
+    for index, document in zip(indexes, documents):
+        if document['email'] in existing:
+            errors.append({'index': index, 'email': document['email'], 'error': 'email already exists'})
+        else:
+            kept.append(document)
+            kept_indexes.append(index)
+
+    now = timezone.now()
+    for document, encoded in zip(kept, hash_passwords([document['password'] for document in kept])):
+        document['password'] = encoded
+        document['created_at'] = now
+
+    failed = set()
+    if kept:
+        try:
+            db.users.insert_many(kept, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get('writeErrors', []):
+                failed.add(error['index'])
+                errors.append({
+                    'index': kept_indexes[error['index']],
+                    'email': kept[error['index']]['email'],
+                    'error': error.get('errmsg', 'write error'),
+                })
+    created = [str(document['_id']) for position, document in enumerate(kept) if position not in failed]
+    errors.sort(key=lambda error: error['index'])
+    return created, errors
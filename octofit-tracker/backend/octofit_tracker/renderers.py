@@ -0,0 +1,47 @@
+"""
+MessagePack support for the API.
+
+``msgpack`` is optional: when it is installed, settings add these classes to
+DRF's renderer/parser lists so clients can send ``Accept: application/msgpack``
+(or ``?format=msgpack``) and post MessagePack bodies.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def _default(value):
+    # Reuse DRF's JSON conversions (datetimes, decimals, UUIDs, lazy strings...)
+    return _encoder.default(value)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders response data as MessagePack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
@@ -1,9 +1,12 @@
 from rest_framework import serializers
 from bson import ObjectId
-from .models import User, Team, Activity, Leaderboard, Workout
+from .exceptions import ServiceUnavailable
+from .hashing import HashingBusy, hash_password
+from .metrics import TimedListSerializer, TimedSerializerMixin
+from .models import User, Team, Activity, Leaderboard, LeaderboardBucket, Workout
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for User model"""
     id = serializers.SerializerMethodField()
     team_name = serializers.SerializerMethodField()
@@ -11,9 +14,17 @@ class UserSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = User
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name', 'email', 'password', 'team_id', 'team_name', 'activities', 'created_at']
         extra_kwargs = {'password': {'write_only': True}}
     
+    def validate_password(self, value):
+        """Store only the hashed password; hashing runs on the shared hashing pool"""
+        try:
+            return hash_password(value)
+        except HashingBusy:
+            raise ServiceUnavailable('Password hashing is saturated, please retry.')
+    
     def get_id(self, obj):
         """Convert ObjectId to string"""
         return str(obj._id)
@@ -37,12 +48,13 @@ class UserSerializer(serializers.ModelSerializer):
         return ActivitySerializer(activities, many=True).data
 
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Team model"""
     id = serializers.SerializerMethodField()
     
     class Meta:
         model = Team
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name', 'description', 'created_at', 'members']
     
     def get_id(self, obj):
@@ -50,25 +62,28 @@ class TeamSerializer(serializers.ModelSerializer):
         return str(obj._id)
 
 
-class ActivitySerializer(serializers.ModelSerializer):
+class ActivitySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Activity model"""
     id = serializers.SerializerMethodField()
     
     class Meta:
         model = Activity
-        fields = ['id', 'user_id', 'activity_type', 'duration', 'distance', 'calories', 'date', 'notes']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'user_id', 'activity_type', 'duration', 'distance', 'calories', 'date', 'notes', 'points']
+        read_only_fields = ['points']
     
     def get_id(self, obj):
         """Convert ObjectId to string"""
         return str(obj._id)
 
 
-class LeaderboardSerializer(serializers.ModelSerializer):
+class LeaderboardSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Leaderboard model"""
     id = serializers.SerializerMethodField()
     
     class Meta:
         model = Leaderboard
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'user_id', 'user_name', 'team_id', 'team_name', 'total_points', 
                   'total_activities', 'total_calories', 'last_updated']
     
@@ -77,12 +92,28 @@ class LeaderboardSerializer(serializers.ModelSerializer):
         return str(obj._id)
 
 
-class WorkoutSerializer(serializers.ModelSerializer):
+class LeaderboardBucketSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for LeaderboardBucket model"""
+    id = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = LeaderboardBucket
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'window', 'period', 'user_id', 'user_name', 'team_id', 'team_name',
+                  'total_points', 'total_activities', 'total_calories', 'last_updated']
+    
+    def get_id(self, obj):
+        """Convert ObjectId to string"""
+        return str(obj._id)
+
+
+class WorkoutSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for Workout model"""
     id = serializers.SerializerMethodField()
     
     class Meta:
         model = Workout
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'name', 'description', 'category', 'difficulty', 'duration', 
                   'calories_estimate', 'instructions']
     
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,8 +57,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'octofit_tracker.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'octofit_tracker.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'octofit_tracker.profiling.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -103,6 +107,14 @@ DATABASES = {
 }
 
 
+# Connection pool for the async (Motor) read path under /api/async/
+ASYNC_MONGO_POOL = {
+    'maxPoolSize': int(os.environ.get('OCTOFIT_ASYNC_POOL_SIZE', 100)),
+    'minPoolSize': 0,
+    'waitQueueTimeoutMS': 5000,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -122,6 +134,27 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing - the PBKDF2 work factor is read from PASSWORD_HASHING so it
+# can be tuned per deployment; hashes run on a bounded pool (octofit_tracker.hashing)
+PASSWORD_HASHERS = [
+    'octofit_tracker.hashing.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('OCTOFIT_HASH_WORKERS', os.cpu_count() or 2)),
+    'MAX_PENDING': 64,
+    'BULK_MAX_PENDING': None,  # queued bulk hashes; defaults to WORKERS
+    'PBKDF2_ITERATIONS': int(os.environ.get('OCTOFIT_PBKDF2_ITERATIONS', 390000)),
+}
+
+# Maximum users accepted by one POST /api/users/bulk/ request
+USER_BULK_MAX = 1000
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -175,4 +208,128 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
         'rest_framework.filters.SearchFilter',
     ],
+    # Compact JSON first so non-browser clients never pay for the browsable API
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'COMPACT_JSON': True,
+    # Client identity for throttling: REMOTE_ADDR unless this many trusted
+    # proxies sit in front of the app, so spoofed X-Forwarded-For is ignored
+    'NUM_PROXIES': int(os.environ.get('OCTOFIT_NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_CLASSES': [
+        'octofit_tracker.throttling.TokenBucketThrottle',
+    ],
+}
+
+# MessagePack is offered when the optional msgpack package is installed
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('octofit_tracker.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('octofit_tracker.renderers.MessagePackParser')
+
+# The browsable API is only offered while developing
+if DEBUG:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('rest_framework.renderers.BrowsableAPIRenderer')
+
+# Response compression (octofit_tracker.compression) - Brotli when the optional
+# brotli package is installed and accepted by the client, otherwise gzip
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': 1024,  # bytes
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+# Token-bucket rate limiting (octofit_tracker.throttling). Every client gets
+# BURST tokens per endpoint, refilled at RATE tokens/second; COSTS weights
+# heavy endpoints by `<basename>.<action>` and PAGE_COST charges deep pages.
+# Use BACKEND 'cache' with a shared CACHE_ALIAS when running several workers.
+THROTTLING = {
+    'ENABLED': os.environ.get('OCTOFIT_THROTTLING', '1') == '1',
+    'RATE': 10.0,
+    'BURST': 60,
+    'COSTS': {
+        'user.list': 5,
+        'user.retrieve': 2,
+        'user.bulk': 20,
+        'activity.list': 2,
+        'leaderboard.list': 2,
+        'dashboard.list': 3,
+    },
+    'PAGE_COST': 0.5,
+    'BACKEND': os.environ.get('OCTOFIT_THROTTLE_BACKEND', 'local'),
+    'CACHE_ALIAS': 'default',
+    'SHARDS': 64,
+}
+
+# /api/dashboard/ (octofit_tracker.dashboard) - sections are fetched in parallel
+# on WORKERS threads and each is cached for its TTL (seconds) in CACHE_ALIAS
+DASHBOARD = {
+    'CACHE_ALIAS': 'default',
+    'WORKERS': 4,
+    'TIMEOUT': 5.0,  # seconds
+    'SECTIONS': {
+        'leaderboard': {'TTL': 15, 'LIMIT': 10},
+        'activities': {'TTL': 5, 'LIMIT': 10},
+        'teams': {'TTL': 60, 'LIMIT': 10},
+        'workouts': {'TTL': 300, 'LIMIT': 6},
+    },
+}
+
+# Activity archival - activities older than this many days are moved to
+# per-month archive collections by `manage.py archive_activities`
+ACTIVITY_ARCHIVE_AFTER_DAYS = int(os.environ.get('ACTIVITY_ARCHIVE_AFTER_DAYS', 365))
+ACTIVITY_ARCHIVE_BATCH_SIZE = 1000
+
+# Active points rule set (see octofit_tracker/scoring.py). After changing it,
+# run `manage.py rescore` to recompute stored points and leaderboard totals.
+SCORING_RULESET_VERSION = 1
+
+# Time-windowed leaderboards - buckets are kept for RETENTION_DAYS after their
+# period ends, then removed by a TTL index (see `manage.py ensure_indexes`)
+LEADERBOARD_WINDOWS = {
+    'day': {'RETENTION_DAYS': 14},
+    'week': {'RETENTION_DAYS': 120},
+    'month': {'RETENTION_DAYS': 400},
+}
+LEADERBOARD_WINDOW_MAX_LIMIT = 100
+
+# Per-request profiling - send `X-Profile-Token: <TOKEN>` to profile a single
+# request, or set a small SAMPLE_RATE (e.g. 0.01) to profile a share of traffic.
+# Results are listed at /api/profiles/ (admin only).
+REQUEST_PROFILING = {
+    'SAMPLE_RATE': float(os.environ.get('OCTOFIT_PROFILE_SAMPLE_RATE', 0)),
+    'TOKEN': os.environ.get('OCTOFIT_PROFILE_TOKEN'),
+    'DIRECTORY': BASE_DIR / 'profiles',
+    'MAX_PROFILES': 200,
+    'TOP_FRAMES': 30,
+}
+
+# Prometheus metrics at /metrics (octofit_tracker.metrics). With several worker
+# processes set DIRECTORY (cleared on deploy) so every worker's samples are
+# merged into each scrape. Set TOKEN to require `Authorization: Bearer <TOKEN>`;
+# without a TOKEN only localhost may scrape unless DEBUG is on.
+METRICS = {
+    'ENABLED': os.environ.get('OCTOFIT_METRICS', '1') == '1',
+    'DIRECTORY': os.environ.get('OCTOFIT_METRICS_DIR'),
+    'FLUSH_INTERVAL': 5.0,  # seconds
+    'STALE_AFTER': 60.0,  # seconds
+    'SHARDS': 16,
+    'TOKEN': os.environ.get('OCTOFIT_METRICS_TOKEN'),
+}
+
+# Group-commit buffer for activity inserts. When enabled, concurrent
+# ActivityViewSet.create calls are coalesced into bulk writes; each request is
+# acknowledged only after its batch is written. Requests beyond MAX_PENDING get
+# a 503 with Retry-After.
+ACTIVITY_WRITE_BUFFER = {
+    'ENABLED': os.environ.get('OCTOFIT_WRITE_BUFFER', '') == '1',
+    'MAX_BATCH': 500,
+    'FLUSH_INTERVAL': 0.05,  # seconds
+    'MAX_PENDING': 5000,
+    'ACK_TIMEOUT': 5.0,  # seconds
+    'JOURNAL': False,
 }
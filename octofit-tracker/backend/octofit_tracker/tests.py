@@ -1,8 +1,39 @@
-from django.test import TestCase
-from rest_framework.test import APITestCase, APIClient
+import asyncio
+import gzip
+import io
+import tempfile
+import threading
+from unittest import mock
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from django.contrib.auth.hashers import check_password
+from django.urls import resolve
+from django.utils.timezone import now as timezone_now
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, force_authenticate
 from rest_framework import status
-from datetime import datetime
+from datetime import datetime, timezone
+from .async_views import to_representation
+from .archive import archive_collection_name, archive_cutoff, iter_months
+from .compression import choose_encoding
+from .dashboard import SECTIONS, build_dashboard
+from .hashing import hash_passwords, submit_hash
+from .importer import init_worker, iter_csv, iter_gpx, iter_ndjson, normalize_chunk
+from .leaderboard import (
+    LeaderboardWriteFailed, apply_increments, bucket_increments, competition_ranks, leaderboard_increments,
+    period_bounds, period_key, revise_activities, stale_name_fixes
+)
+from .loadtest import drive_endpoint, percentile, summarize
+from .metrics import Registry, label_key, read_snapshots, render, write_snapshot
+from .profiling import load_profiles
+from .provisioning import clean_row, provision_users
+from .renderers import msgpack
+from .scoring import RuleSet, columns, score_activity
+from .throttling import LocalBucketStore, take
+from .write_buffer import ActivityRejected, ActivityWriteBuffer, BufferFull, write_activities
 from .models import User, Team, Activity, Leaderboard, Workout
+from .serializers import TeamSerializer
+from .views import MergedActivities, ProfileViewSet
 
 
 class UserModelTest(TestCase):
@@ -135,3 +166,601 @@ class APIEndpointTest(APITestCase):
         """Test workouts endpoint"""
         response = self.client.get('/api/workouts/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ArchiveHelpersTest(SimpleTestCase):
+    """Test cases for activity archive helpers"""
+    
+    def test_cutoff_is_month_aligned(self):
+        """Test the archive cutoff is rounded down to the start of a month"""
+        now = datetime(2026, 10, 19, 15, 30, tzinfo=timezone.utc)
+        self.assertEqual(archive_cutoff(now=now, days=30), datetime(2026, 9, 1, tzinfo=timezone.utc))
+    
+    def test_iter_months_spans_year_boundary(self):
+        """Test month iteration across a year boundary"""
+        start = datetime(2025, 11, 15, tzinfo=timezone.utc)
+        end = datetime(2026, 2, 1, tzinfo=timezone.utc)
+        self.assertEqual(list(iter_months(start, end)), [(2025, 11), (2025, 12), (2026, 1)])
+    
+    def test_archive_collection_name(self):
+        """Test archive collection naming"""
+        self.assertEqual(archive_collection_name(2026, 3), 'activities_archive_2026_03')
+    
+    def test_merged_listing_reads_only_the_page(self):
+        """Test archived listings fetch at most one page depth from each source"""
+        def activity(day):
+            return Activity(_id=ObjectId(), user_id='u1', activity_type='Running', duration=30,
+                            calories=100, date=datetime(2024, 1, day, tzinfo=timezone.utc))
+        
+        class HotActivities(list):
+            def count(self):
+                return len(self)
+        
+        hot = HotActivities([activity(day) for day in (20, 10, 2)])
+        archived = [{'_id': ObjectId(), 'user_id': 'u1', 'activity_type': 'Yoga', 'duration': 60,
+                     'calories': 200, 'date': datetime(2023, 12, day, tzinfo=timezone.utc)} for day in (31, 30)]
+        with mock.patch('octofit_tracker.views.find_archived', return_value=archived) as find, \
+                mock.patch('octofit_tracker.views.count_archived', return_value=40):
+            merged = MergedActivities(hot, datetime(2023, 1, 1, tzinfo=timezone.utc), None)
+            page = merged[2:4]
+            self.assertEqual(merged.count(), 43)
+        self.assertEqual([item.date.day for item in page], [2, 31])
+        self.assertEqual(find.call_args.kwargs['limit'], 4)
+
+
+class LoadTestStatsTest(SimpleTestCase):
+    """Test cases for load test statistics"""
+    
+    def test_percentile_interpolates(self):
+        """Test percentiles interpolate between samples"""
+        values = [1, 2, 3, 4]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 50), 2.5)
+        self.assertEqual(percentile(values, 100), 4)
+        self.assertIsNone(percentile([], 50))
+    
+    def test_summarize_reports_milliseconds(self):
+        """Test the summary reports throughput and latency in milliseconds"""
+        report = summarize([0.01, 0.02, 0.03], errors=1, elapsed=0.5, total_bytes=300)
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['throughput_rps'], 6.0)
+        self.assertEqual(report['p50_ms'], 20.0)
+        self.assertEqual(report['bytes_per_response'], 100.0)
+    
+    def test_hung_and_malformed_responses_count_as_errors(self):
+        """Test a server that never answers or answers garbage does not stall or abort the run"""
+        async def hang(reader, writer):
+            await asyncio.sleep(5)
+        
+        async def garbage(reader, writer):
+            writer.write(b'\r\n\r\nnot http')
+            await writer.drain()
+            writer.close()
+        
+        async def run(handler):
+            server = await asyncio.start_server(handler, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await drive_endpoint(f'http://127.0.0.1:{port}', '/', 2, 2, timeout=0.2)
+            finally:
+                server.close()
+        
+        for handler in (hang, garbage):
+            report = asyncio.run(run(handler))
+            self.assertEqual((report['requests'], report['errors']), (2, 2))
+
+
+class RequestProfilingTest(SimpleTestCase):
+    """Test cases for the request profiling middleware"""
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(REQUEST_PROFILING={
+            'TOKEN': 'secret', 'DIRECTORY': self.directory, 'MAX_PROFILES': 2, 'TOP_FRAMES': 1000,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+    
+    def test_token_header_profiles_request(self):
+        """Test a matching token profiles the request and caps stored profiles"""
+        for _ in range(3):
+            response = self.client.get('/api/', HTTP_X_PROFILE_TOKEN='secret')
+            self.assertIn('X-Profile-Id', response)
+        profiles = load_profiles(self.directory)
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual(profiles[0]['path'], '/api/')
+        self.assertTrue(profiles[0]['frames'])
+    
+    async def test_asgi_profile_includes_the_view(self):
+        """Test profiles taken under ASGI contain the sync view's own frames"""
+        response = await AsyncClient().get('/api/', **{'X-Profile-Token': 'secret'})
+        self.assertIn('X-Profile-Id', response)
+        frames = [frame['function'] for frame in load_profiles(self.directory)[0]['frames']]
+        self.assertTrue(any('api_root' in frame for frame in frames), frames)
+    
+    def test_wrong_token_is_ignored(self):
+        """Test requests without the right token are not profiled"""
+        response = self.client.get('/api/', HTTP_X_PROFILE_TOKEN='wrong')
+        self.assertNotIn('X-Profile-Id', response)
+    
+    def test_invalid_frames_parameter(self):
+        """Test a non-integer ?frames= is a 400, not a server error"""
+        request = APIRequestFactory().get('/api/profiles/', {'frames': 'abc'})
+        force_authenticate(request, user=mock.Mock(is_staff=True, is_authenticated=True, pk=1))
+        response = ProfileViewSet.as_view({'get': 'list'})(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LeaderboardIncrementsTest(SimpleTestCase):
+    """Test cases for leaderboard delta aggregation"""
+    
+    def test_increments_are_grouped_per_user(self):
+        """Test activities are folded into one delta per user"""
+        increments = leaderboard_increments([
+            {'user_id': 'a', 'calories': 300},
+            {'user_id': 'a', 'calories': 200},
+            {'user_id': 'b', 'calories': 50},
+        ])
+        self.assertEqual(increments['a'], {'total_points': 700, 'total_activities': 2, 'total_calories': 500})
+        self.assertEqual(increments['b']['total_points'], 150)
+    
+    def test_revised_activity_applies_the_difference(self):
+        """Test edits and deletes apply only the change in points and calories"""
+        moment = timezone_now()
+        old = {'user_id': 'a', 'calories': 300, 'points': 400, 'date': moment}
+        new = dict(old, calories=500, points=600)
+        with mock.patch('octofit_tracker.leaderboard.apply_increments') as apply:
+            revise_activities([old], [new])
+            totals, buckets = apply.call_args[0]
+            self.assertEqual(totals, {'a': {'total_points': 200, 'total_activities': 0, 'total_calories': 200}})
+            self.assertEqual(buckets[('day', period_key('day', moment), 'a')]['total_points'], 200)
+            revise_activities([old], [])
+            totals, _ = apply.call_args[0]
+            self.assertEqual(totals, {'a': {'total_points': -400, 'total_activities': -1, 'total_calories': -300}})
+    
+    def test_failed_bucket_write_does_not_repeat_totals(self):
+        """Test a bucket failure reports only the bucket deltas as unapplied"""
+        db = mock.MagicMock()
+        db.leaderboard_buckets.bulk_write.side_effect = PyMongoError
+        activities = [{'user_id': 'a', 'calories': 300, 'points': 400, 'date': timezone_now()}]
+        with self.assertRaises(LeaderboardWriteFailed) as raised:
+            apply_increments(leaderboard_increments(activities), bucket_increments(activities), db=db)
+        self.assertEqual(raised.exception.increments, {})
+        self.assertEqual(raised.exception.buckets, bucket_increments(activities))
+        db.leaderboard.bulk_write.assert_called_once()
+
+
+class ActivityWriteBufferTest(SimpleTestCase):
+    """Test cases for the group-commit activity buffer"""
+    
+    def test_concurrent_submits_are_coalesced(self):
+        """Test submits are flushed together and acknowledged after the flush"""
+        batches = []
+        buffer = ActivityWriteBuffer(lambda documents: batches.append(list(documents)) or {},
+                                     max_batch=3, flush_interval=5)
+        futures = [buffer.submit({'n': i}) for i in range(3)]
+        self.assertEqual([future.result(timeout=2)['n'] for future in futures], [0, 1, 2])
+        self.assertEqual(len(batches), 1)
+        buffer.close()
+    
+    def test_failed_documents_are_rejected(self):
+        """Test per-document failures only fail their own futures"""
+        buffer = ActivityWriteBuffer(lambda documents: {1: 'duplicate key'}, max_batch=2, flush_interval=5)
+        ok, failed = buffer.submit({}), buffer.submit({})
+        self.assertEqual(ok.result(timeout=2), {})
+        with self.assertRaises(ActivityRejected):
+            failed.result(timeout=2)
+        buffer.close()
+    
+    def test_leaderboard_failure_does_not_fail_written_activities(self):
+        """Test a leaderboard error after a successful insert is retried, not raised"""
+        db = mock.MagicMock()
+        with mock.patch('octofit_tracker.write_buffer.get_db', return_value=db), \
+                mock.patch('octofit_tracker.write_buffer.apply_activities',
+                           side_effect=LeaderboardWriteFailed({}, {('day', '2026-10-19', 'u1'): {}})), \
+                mock.patch('octofit_tracker.write_buffer.background.submit') as submit, \
+                self.assertLogs('octofit_tracker.write_buffer', 'ERROR'):
+            self.assertEqual(write_activities([{'user_id': 'u1'}]), {})
+        submit.assert_called_once_with(apply_increments, {}, {('day', '2026-10-19', 'u1'): {}})
+    
+    def test_full_buffer_applies_backpressure(self):
+        """Test submits beyond max_pending are refused"""
+        buffer = ActivityWriteBuffer(lambda documents: {}, max_batch=10, flush_interval=5, max_pending=1)
+        buffer.submit({})
+        with self.assertRaises(BufferFull):
+            buffer.submit({})
+        buffer.close()
+
+
+GPX_SAMPLE = b"""<?xml version="1.0"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1">
+  <trk><name>Morning run</name><type>running</type><trkseg>
+    <trkpt lat="0.0" lon="0.0"><time>2024-05-01T07:00:00Z</time></trkpt>
+    <trkpt lat="0.0" lon="0.01"><time>2024-05-01T07:30:00Z</time></trkpt>
+  </trkseg></trk>
+</gpx>"""
+
+
+class ActivityImporterTest(SimpleTestCase):
+    """Test cases for the streaming activity importer"""
+    
+    def setUp(self):
+        init_worker({'runner@example.com': 'user123'}, None)
+    
+    def test_csv_rows_are_normalized(self):
+        """Test CSV rows map onto the Activity schema and bad rows are rejected"""
+        source = io.StringIO(
+            "email,type,duration_seconds,distance_m,calories,date\n"
+            "runner@example.com,running,1800,5000,320,2024-05-01\n"
+            "runner@example.com,running,,,,2024-05-02\n"
+        )
+        documents, rejected = normalize_chunk(list(iter_csv(source)))
+        self.assertEqual(rejected, 1)
+        self.assertEqual(documents[0]['user_id'], 'user123')
+        self.assertEqual(documents[0]['activity_type'], 'Running')
+        self.assertEqual(documents[0]['duration'], 30)
+        self.assertEqual(documents[0]['distance'], 5.0)
+        self.assertEqual(documents[0]['date'], datetime(2024, 5, 1, tzinfo=timezone.utc))
+    
+    def test_gpx_tracks_are_summarized(self):
+        """Test GPX tracks become one row with duration and distance"""
+        rows = list(iter_gpx(io.BytesIO(GPX_SAMPLE)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['duration_seconds'], 1800)
+        self.assertAlmostEqual(rows[0]['distance_km'], 1.112, places=2)
+        self.assertEqual(rows[0]['notes'], 'Morning run')
+    
+    def test_unparseable_rows_are_rejected(self):
+        """Test malformed NDJSON lines and GPX points count as rejected rows"""
+        source = io.StringIO(
+            '{"email": "runner@example.com", "duration": 30, "date": "2024-05-01"}\n'
+            '{"email": "runner@\n'
+            '[1, 2]\n'
+        )
+        documents, rejected = normalize_chunk(list(iter_ndjson(source)))
+        self.assertEqual((len(documents), rejected), (1, 2))
+        gpx = GPX_SAMPLE.replace(b'<trkpt lat="0.0" lon="0.01">', b'<trkpt lon="0.01">')
+        documents, rejected = normalize_chunk(list(iter_gpx(io.BytesIO(gpx))))
+        self.assertEqual((len(documents), rejected), (0, 1))
+    
+    def test_unknown_users_are_rejected(self):
+        """Test rows naming an unknown email or user id are rejected, not imported"""
+        rows = [
+            {'email': 'runner@example.com', 'duration': 30, 'date': '2024-05-01'},
+            {'email': 'stranger@example.com', 'duration': 30, 'date': '2024-05-01'},
+            {'user_id': 'user123', 'duration': 30, 'date': '2024-05-01'},
+            {'user_id': 'nobody', 'duration': 30, 'date': '2024-05-01'},
+        ]
+        documents, rejected = normalize_chunk(rows)
+        self.assertEqual(rejected, 2)
+        self.assertEqual([document['user_id'] for document in documents], ['user123', 'user123'])
+
+
+class LeaderboardWindowTest(SimpleTestCase):
+    """Test cases for time-windowed leaderboard buckets"""
+    
+    def test_period_keys(self):
+        """Test period identifiers for each window"""
+        moment = datetime(2026, 10, 15, 9, 0, tzinfo=timezone.utc)
+        self.assertEqual(period_key('day', moment), '2026-10-15')
+        self.assertEqual(period_key('week', moment), '2026-W42')
+        self.assertEqual(period_key('month', moment), '2026-10')
+    
+    def test_period_bounds(self):
+        """Test period bounds and invalid periods"""
+        self.assertEqual(period_bounds('week', '2026-W42'), (
+            datetime(2026, 10, 12, tzinfo=timezone.utc), datetime(2026, 10, 19, tzinfo=timezone.utc)))
+        self.assertEqual(period_bounds('month', '2026-12')[1], datetime(2027, 1, 1, tzinfo=timezone.utc))
+        with self.assertRaises(ValueError):
+            period_bounds('week', '2026-10')
+    
+    def test_bucket_increments_skip_expired_periods(self):
+        """Test activities only increment buckets that have not expired"""
+        now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+        increments = bucket_increments([
+            {'user_id': 'a', 'calories': 100, 'date': datetime(2026, 10, 18, tzinfo=timezone.utc)},
+            {'user_id': 'a', 'calories': 100, 'date': datetime(2026, 6, 1, tzinfo=timezone.utc)},
+        ], now=now)
+        self.assertEqual(increments[('day', '2026-10-18', 'a')]['total_points'], 200)
+        self.assertEqual(increments[('month', '2026-06', 'a')]['total_activities'], 1)
+        self.assertNotIn(('day', '2026-06-01', 'a'), increments)
+    
+    def test_tied_entries_share_a_rank(self):
+        """Test the top-K list ranks ties like the single-user lookup"""
+        self.assertEqual(competition_ranks([900, 700, 700, 500]), [1, 2, 2, 4])
+        self.assertEqual(competition_ranks([]), [])
+
+
+class ScoringTest(SimpleTestCase):
+    """Test cases for the points engine"""
+    
+    def test_default_ruleset_matches_original_formula(self):
+        """Test the v1 rule set awards calories plus 100 per activity"""
+        self.assertEqual(score_activity({'calories': 320, 'activity_type': 'Running'}), 420)
+    
+    def test_vectorized_scores_match_scalar_scores(self):
+        """Test NumPy batch scoring agrees with per-activity scoring"""
+        ruleset = RuleSet(version=99, distance_bonus_per_km=10, type_multipliers={'Swimming': 1.5})
+        documents = [
+            {'calories': 300, 'distance': 5.25, 'activity_type': 'Running'},
+            {'calories': 200, 'distance': None, 'activity_type': 'Swimming'},
+            {'calories': None, 'distance': 2.0, 'activity_type': 'Swimming'},
+        ]
+        vectorized = ruleset.score_arrays(*columns(documents)).tolist()
+        self.assertEqual(vectorized, [ruleset.score(document) for document in documents])
+        self.assertEqual(vectorized, [452, 400, 130])
+
+
+class StaleNameFixesTest(SimpleTestCase):
+    """Test cases for denormalized name verification"""
+    
+    def test_only_stale_fields_are_rewritten(self):
+        """Test fixes are generated only for entries whose copies differ"""
+        details = {'u1': {'user_name': 'New Name', 'team_id': 't1', 'team_name': 'Team One'}}
+        documents = [
+            {'_id': 1, 'user_id': 'u1', 'user_name': 'Old Name', 'team_id': 't1', 'team_name': 'Team One'},
+            {'_id': 2, 'user_id': 'u1', 'user_name': 'New Name', 'team_id': 't1', 'team_name': 'Team One'},
+            {'_id': 3, 'user_id': 'gone', 'user_name': 'Deleted'},
+        ]
+        operations = stale_name_fixes(documents, details)
+        self.assertEqual(len(operations), 1)
+        self.assertEqual(operations[0]._filter, {'_id': 1})
+        self.assertEqual(operations[0]._doc, {'$set': {'user_name': 'New Name'}})
+
+
+@override_settings(PASSWORD_HASHING={'WORKERS': 2, 'MAX_PENDING': 4, 'PBKDF2_ITERATIONS': 1000})
+class PasswordHashingTest(SimpleTestCase):
+    """Test cases for pooled password hashing and user provisioning"""
+    
+    def test_passwords_are_hashed_in_order(self):
+        """Test bulk hashing preserves order and uses the configured work factor"""
+        encoded = hash_passwords(['first-secret', 'second-secret'])
+        self.assertTrue(encoded[0].startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(check_password('first-secret', encoded[0]))
+        self.assertTrue(check_password('second-secret', encoded[1]))
+    
+    def test_hash_like_passwords_are_hashed(self):
+        """Test values that look like encoded hashes are still hashed"""
+        for raw_password in ('pbkdf2_sha256$hunter2', hash_passwords(['secret'])[0]):
+            encoded = hash_passwords([raw_password])[0]
+            self.assertNotEqual(encoded, raw_password)
+            self.assertTrue(check_password(raw_password, encoded))
+    
+    def test_bulk_hashing_leaves_interactive_slots(self):
+        """Test a bulk run in progress does not make interactive hashing busy"""
+        started = threading.Event()
+        release = threading.Event()
+        
+        def slow_make_password(raw_password):
+            started.set()
+            release.wait(5)
+            return raw_password
+        
+        # Fresh pool sized from this test's settings (2 workers + 4 pending)
+        with mock.patch.multiple('octofit_tracker.hashing', _executor=None, _slots=None, _bulk_slots=None), \
+                mock.patch('django.contrib.auth.hashers.make_password', slow_make_password):
+            bulk = threading.Thread(target=hash_passwords, args=(['x'] * 20,))
+            bulk.start()
+            started.wait(5)
+            futures = [submit_hash('interactive') for _ in range(4)]
+            release.set()
+            bulk.join(5)
+        self.assertEqual([future.result(5) for future in futures], ['interactive'] * 4)
+    
+    def test_provisioning_rows_are_validated(self):
+        """Test bulk provisioning rejects incomplete rows"""
+        document, error = clean_row({'name': 'Tony', 'email': 'Tony@Stark.com', 'password': 'x'})
+        self.assertIsNone(error)
+        self.assertEqual(document['email'], 'tony@stark.com')
+        self.assertEqual(clean_row({'name': 'Tony', 'email': 'nope', 'password': 'x'})[1], 'a valid email is required')
+    
+    def test_provisioning_rejects_badly_shaped_rows(self):
+        """Test non-object rows and non-string fields become per-row errors"""
+        db = mock.MagicMock()
+        db.users.find.return_value = []
+        rows = [
+            'x',
+            {'name': 5, 'email': 'a@example.com', 'password': 'x'},
+            {'name': 'Tony', 'email': 'b@example.com', 'password': 123},
+            {'name': 'Tony', 'email': 'c@example.com', 'password': 'x', 'team_id': 7},
+        ]
+        created, errors = provision_users(rows, db=db)
+        self.assertEqual(created, [])
+        self.assertEqual([error['error'] for error in errors], [
+            'each row must be an object', 'name must be a string',
+            'password must be a string', 'team_id must be a string',
+        ])
+        db.users.insert_many.assert_not_called()
+
+
+class TokenBucketThrottleTest(SimpleTestCase):
+    """Test cases for token-bucket rate limiting"""
+    
+    def test_bucket_refills_over_time(self):
+        """Test costs drain the bucket and time refills it"""
+        store = LocalBucketStore(shards=4)
+        self.assertEqual(store.take('client|user.list', 5, rate=1, burst=6, now=0), 0)
+        self.assertEqual(store.take('client|user.list', 5, rate=1, burst=6, now=0), 4)
+        self.assertEqual(store.take('client|user.list', 5, rate=1, burst=6, now=4), 0)
+    
+    @override_settings(THROTTLING={'RATE': 0.5, 'BURST': 2, 'BACKEND': 'local', 'SHARDS': 2})
+    def test_exhausted_client_gets_retry_after(self):
+        """Test throttled requests return 429 with Retry-After"""
+        responses = [self.client.get('/api/', REMOTE_ADDR='10.0.0.9') for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses[:2]], [200, 200])
+        self.assertEqual(responses[2].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(responses[2]['Retry-After'], '2')
+    
+    @override_settings(THROTTLING={'RATE': 0.5, 'BURST': 2, 'BACKEND': 'local', 'SHARDS': 2})
+    def test_forwarded_for_does_not_reset_bucket(self):
+        """Test a client cannot get a fresh bucket by varying X-Forwarded-For"""
+        responses = [
+            self.client.get('/api/', REMOTE_ADDR='10.0.0.10', HTTP_X_FORWARDED_FOR=f'192.0.2.{i}')
+            for i in range(3)
+        ]
+        self.assertEqual(responses[2].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 10})
+class WireFormatTest(SimpleTestCase):
+    """Test cases for content negotiation and response compression"""
+    
+    def test_encoding_negotiation(self):
+        """Test Accept-Encoding q-values are honoured"""
+        self.assertEqual(choose_encoding('gzip, deflate'), 'gzip')
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding('gzip;q=0'))
+    
+    def test_gzip_response(self):
+        """Test responses above the threshold are gzip compressed"""
+        response = self.client.get('/api/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'leaderboard', gzip.decompress(response.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+    
+    def test_compact_json_by_default(self):
+        """Test non-browser clients get compact JSON"""
+        response = self.client.get('/api/', HTTP_ACCEPT='*/*')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b'\n', response.content)
+    
+    def test_msgpack_negotiation(self):
+        """Test clients can ask for MessagePack"""
+        if msgpack is None:
+            self.skipTest('msgpack is not installed')
+        response = self.client.get('/api/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIn('users', msgpack.unpackb(response.content))
+
+
+class AsyncReadPathTest(SimpleTestCase):
+    """Test cases for the async read path document shaping"""
+    
+    def test_representation_matches_serializer_format(self):
+        """Test ids become strings and UTC dates end with Z"""
+        object_id = ObjectId()
+        document = {'_id': object_id, 'name': 'Blue', 'created_at': datetime(2026, 3, 1, 8, 30), 'extra': 1}
+        data = to_representation(document, ['id', 'name', 'created_at'])
+        self.assertEqual(data, {'id': str(object_id), 'name': 'Blue', 'created_at': '2026-03-01T08:30:00Z'})
+    
+    def test_async_routes_refused_under_wsgi(self):
+        """Test the async endpoints answer 501 outside ASGI"""
+        response = self.client.get('/api/async/teams/')
+        self.assertEqual(response.status_code, 501)
+    
+    @override_settings(THROTTLING={'RATE': 0.5, 'BURST': 2, 'BACKEND': 'local', 'SHARDS': 3})
+    async def test_async_routes_share_the_sync_bucket(self):
+        """Test the async endpoints draw from the same token bucket as the DRF ones"""
+        request = RequestFactory().get('/api/teams/')
+        for _ in range(2):
+            take(request, '127.0.0.1', 'team.list')
+        response = await AsyncClient().get('/api/async/teams/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '2')
+    
+    async def test_sync_only_parameters_are_rejected(self):
+        """Test filters only the DRF endpoints implement are refused, not ignored"""
+        response = await AsyncClient().get('/api/async/activities/', {'date_after': '2020-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await AsyncClient().get('/api/async/leaderboard/', {'window': 'week'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(DASHBOARD={'SECTIONS': {'teams': {'TTL': 60, 'LIMIT': 2}}})
+class DashboardTest(SimpleTestCase):
+    """Test cases for the combined dashboard endpoint"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_sections_are_cached(self):
+        """Test a section is computed once within its TTL"""
+        teams = mock.Mock(return_value=[{'name': 'Blue'}])
+        with mock.patch.dict(SECTIONS, teams=teams):
+            for _ in range(2):
+                data, errors = build_dashboard(['teams'], db=object())
+        self.assertEqual(data, {'teams': [{'name': 'Blue'}]})
+        self.assertEqual(errors, {})
+        teams.assert_called_once()
+        self.assertEqual(teams.call_args[0][0], 2)
+    
+    def test_failed_section_is_reported(self):
+        """Test one failing section does not fail the dashboard"""
+        with mock.patch.dict(SECTIONS, teams=mock.Mock(side_effect=RuntimeError),
+                             workouts=mock.Mock(return_value=[])):
+            with self.assertLogs('octofit_tracker.dashboard', 'ERROR'):
+                data, errors = build_dashboard(['teams', 'workouts'], db=object())
+        self.assertEqual(data, {'workouts': []})
+        self.assertEqual(errors, {'teams': 'Unavailable.'})
+    
+    def test_unknown_section_rejected(self):
+        """Test ?sections= only accepts known sections"""
+        response = self.client.get('/api/dashboard/?sections=teams,bogus')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MetricsTest(SimpleTestCase):
+    """Test cases for the Prometheus metrics registry and endpoint"""
+    
+    def test_histogram_exposition(self):
+        """Test histograms are exposed with cumulative buckets, sum and count"""
+        registry = Registry(shards=2, buckets=(0.1, 1.0))
+        labels = label_key(command='find')
+        for value in (0.05, 0.5, 2.0):
+            registry.observe('octofit_mongodb_command_duration_seconds', labels, value)
+        text = render(registry.snapshot(), registry.buckets)
+        self.assertIn('# TYPE octofit_mongodb_command_duration_seconds histogram', text)
+        self.assertIn('octofit_mongodb_command_duration_seconds_bucket{command="find",le="0.1"} 1', text)
+        self.assertIn('octofit_mongodb_command_duration_seconds_bucket{command="find",le="1.0"} 2', text)
+        self.assertIn('octofit_mongodb_command_duration_seconds_bucket{command="find",le="+Inf"} 3', text)
+        self.assertIn('octofit_mongodb_command_duration_seconds_count{command="find"} 3', text)
+    
+    def test_worker_snapshots_are_merged(self):
+        """Test snapshots from several workers sum, and stale gauges are dropped"""
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(2):
+                registry = Registry(shards=2)
+                registry.inc('octofit_cache_requests_total', label_key(cache='dashboard', result='hit'))
+                registry.inc('octofit_mongodb_pool_connections', label_key(address='db:27017'), 3)
+                write_snapshot(registry, directory)
+            fresh = read_snapshots(directory, registry.buckets, stale_after=60)
+            stale = read_snapshots(directory, registry.buckets, stale_after=60, now=10 ** 12)
+        hits = ('octofit_cache_requests_total', label_key(cache='dashboard', result='hit'))
+        connections = ('octofit_mongodb_pool_connections', label_key(address='db:27017'))
+        self.assertEqual(fresh[hits], 2)
+        self.assertEqual(fresh[connections], 6)
+        self.assertEqual(stale[hits], 2)
+        self.assertNotIn(connections, stale)
+    
+    def test_requests_are_recorded(self):
+        """Test the endpoint reports latency per view"""
+        self.client.get('/api/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('octofit_http_request_duration_seconds_count{action="",method="GET",view="api-root"}',
+                      response.content.decode())
+    
+    def test_scrapes_are_restricted(self):
+        """Test remote scrapes need the token, and without one only localhost is answered"""
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.5').status_code, 403)
+        with override_settings(METRICS={'TOKEN': 'scrape'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer scrape')
+            self.assertEqual(response.status_code, 200)
+    
+    def test_serialization_is_timed_separately(self):
+        """Test top-level serializer.data is recorded once per evaluation"""
+        request = RequestFactory().get('/api/teams/')
+        request.resolver_match = resolve('/api/teams/')
+        team = Team(_id=ObjectId(), name='Blue', description='', members=[])
+        serializer = TeamSerializer([team], many=True, context={'request': request})
+        registry = Registry(shards=1)
+        with mock.patch('octofit_tracker.metrics.get_registry', return_value=registry):
+            serializer.data
+            serializer.data
+        samples = registry.snapshot()
+        labels = label_key(view='team-list', action='list', method='GET')
+        self.assertEqual(sum(samples[('octofit_serialize_duration_seconds', labels)][:-1]), 1)
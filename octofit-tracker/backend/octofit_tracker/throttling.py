@@ -0,0 +1,157 @@
+"""
+Token-bucket rate limiting for the API.
+
+Each ``(client, endpoint)`` pair owns a bucket refilled at ``RATE`` tokens per
+second up to ``BURST`` tokens. A request spends its endpoint's cost from
+``COSTS`` (keyed ``<basename>.<action>``, default 1) plus ``PAGE_COST`` per
+page number requested, so expensive endpoints and deep pagination drain the
+budget faster. Rejected requests get DRF's 429 response with ``Retry-After``.
+
+Buckets live in an in-process store split into ``SHARDS`` independently locked
+dicts, so concurrent requests rarely contend and each check is a few dict
+operations. For multi-worker deployments set ``BACKEND`` to ``'cache'`` to keep
+buckets in the Django cache named by ``CACHE_ALIAS`` (e.g. a local memcached or
+file cache); that store trades exactness under races for sharing.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+def get_config():
+    config = {
+        'ENABLED': True,
+        'RATE': 10.0,
+        'BURST': 60,
+        'COSTS': {},
+        'PAGE_COST': 0.0,
+        'BACKEND': 'local',
+        'CACHE_ALIAS': 'default',
+        'SHARDS': 64,
+        'MAX_KEYS_PER_SHARD': 10000,
+    }
+    config.update(getattr(settings, 'THROTTLING', {}))
+    return config
+
+
+def refill(tokens, updated, now, rate, burst):
+    """Token count after refilling a bucket from ``updated`` to ``now``"""
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def spend(state, cost, now, rate, burst):
+    """
+    Try to spend ``cost`` tokens from a ``(tokens, updated)`` bucket state.
+
+    Returns ``(new_state, wait)`` where ``wait`` is 0 when the request is
+    allowed, otherwise the seconds until enough tokens will be available.
+    """
+    tokens = burst if state is None else refill(state[0], state[1], now, rate, burst)
+    cost = min(cost, burst)
+    if tokens >= cost:
+        return (tokens - cost, now), 0.0
+    return (tokens, now), (cost - tokens) / rate
+
+
+class LocalBucketStore:
+    """In-process bucket store sharded across independently locked dicts"""
+
+    def __init__(self, shards=64, max_keys_per_shard=10000):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def take(self, key, cost, rate, burst, now=None):
+        now = time.monotonic() if now is None else now
+        buckets, lock = self.shards[hash(key) % len(self.shards)]
+        with lock:
+            state, wait = spend(buckets.get(key), cost, now, rate, burst)
+            buckets[key] = state
+            if len(buckets) > self.max_keys_per_shard:
+                self._prune(buckets, now, rate, burst)
+        return wait
+
+    @staticmethod
+    def _prune(buckets, now, rate, burst):
+        # Buckets that have refilled completely carry no state worth keeping
+        idle = burst / rate
+        for key in [key for key, (_, updated) in buckets.items() if now - updated >= idle]:
+            del buckets[key]
+
+
+class CacheBucketStore:
+    """Bucket store backed by a Django cache shared between worker processes"""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, cost, rate, burst, now=None):
+        now = time.time() if now is None else now
+        cache_key = f'throttle:{key}'
+        state, wait = spend(self.cache.get(cache_key), cost, now, rate, burst)
+        self.cache.set(cache_key, state, timeout=int(burst / rate) + 1)
+        return wait
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(config):
+    backend_key = (config['BACKEND'], config['CACHE_ALIAS'], config['SHARDS'])
+    store = _stores.get(backend_key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(backend_key)
+            if store is None:
+                if config['BACKEND'] == 'cache':
+                    store = CacheBucketStore(config['CACHE_ALIAS'])
+                else:
+                    store = LocalBucketStore(config['SHARDS'], config['MAX_KEYS_PER_SHARD'])
+                _stores[backend_key] = store
+    return store
+
+
+def get_cost(request, scope, config):
+    """Token cost of a request to ``scope``, including any deep-page surcharge"""
+    cost = config['COSTS'].get(scope, 1)
+    if config['PAGE_COST']:
+        try:
+            page = int(request.GET.get('page', 1))
+        except (TypeError, ValueError):
+            page = 1
+        cost += max(page - 1, 0) * config['PAGE_COST']
+    return cost
+
+
+def take(request, client, scope, config=None):
+    """Spend a request's cost from ``client``'s bucket for ``scope``; returns the wait (0 if allowed)"""
+    config = config or get_config()
+    if not config['ENABLED']:
+        return 0
+    return get_store(config).take(
+        f'{client}|{scope}', get_cost(request, scope, config), config['RATE'], config['BURST']
+    )
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Per-client, per-endpoint token bucket with weighted request costs"""
+
+    def get_scope(self, view):
+        basename = getattr(view, 'basename', None) or view.__class__.__name__
+        action = getattr(view, 'action', None)
+        return f'{basename}.{action}' if action else basename
+
+    def allow_request(self, request, view):
+        config = get_config()
+        if not config['ENABLED']:
+            return True
+        user = getattr(request, 'user', None)
+        client = f'user:{user.pk}' if user is not None and user.is_authenticated else self.get_ident(request)
+        self._wait = take(request, client, self.get_scope(view), config)
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
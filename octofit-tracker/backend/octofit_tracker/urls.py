@@ -19,9 +19,11 @@ from django.urls import path, include
 from rest_framework import routers
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from .async_views import RESOURCES, resource_detail, resource_list
+from .metrics import metrics_view
 from .views import (
     UserViewSet, TeamViewSet, ActivityViewSet,
-    LeaderboardViewSet, WorkoutViewSet
+    LeaderboardViewSet, WorkoutViewSet, ProfileViewSet, DashboardViewSet
 )
 
 # Router configuration
@@ -31,6 +33,8 @@ router.register(r'teams', TeamViewSet, basename='team')
 router.register(r'activities', ActivityViewSet, basename='activity')
 router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
 router.register(r'workouts', WorkoutViewSet, basename='workout')
+router.register(r'profiles', ProfileViewSet, basename='profile')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 # Determine base URL
 codespace_name = os.environ.get('CODESPACE_NAME')
@@ -51,12 +55,24 @@ def api_root(request, format=None):
         'activities': f"{base_url}/api/activities/",
         'leaderboard': f"{base_url}/api/leaderboard/",
         'workouts': f"{base_url}/api/workouts/",
+        'dashboard': f"{base_url}/api/dashboard/",
     })
 
 
+# Async (Motor) read path for ASGI deployments
+async_urlpatterns = [
+    path(f'{resource}/', resource_list, {'resource': resource}, name=f'async-{resource}-list')
+    for resource in RESOURCES
+] + [
+    path(f'{resource}/<str:pk>/', resource_detail, {'resource': resource}, name=f'async-{resource}-detail')
+    for resource in RESOURCES
+]
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', api_root, name='api-root'),
     path('api/', api_root, name='api-root'),
+    path('api/async/', include(async_urlpatterns)),
     path('api/', include(router.urls)),
 ]
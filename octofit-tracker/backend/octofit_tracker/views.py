@@ -1,14 +1,41 @@
+import heapq
+import itertools
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+from bson import ObjectId
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from pymongo.errors import PyMongoError
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 from rest_framework.filters import OrderingFilter, SearchFilter
+from . import background
+from .archive import archive_cutoff, count_archived, find_archived
+from .dashboard import SECTIONS, build_dashboard
+from .exceptions import ServiceUnavailable
+from .leaderboard import (
+    WINDOWS, LeaderboardWriteFailed, apply_activities, apply_increments, competition_ranks, period_bounds,
+    period_key, propagate_team_name, propagate_user, revise_activities, window_rank, window_top
+)
+from .write_buffer import ActivityRejected, BufferFull, get_activity_buffer, get_config as get_write_buffer_config
+from .profiling import load_profile, load_profiles
+from .provisioning import provision_users
+from .scoring import apply_score
 from .models import User, Team, Activity, Leaderboard, Workout
 from .serializers import (
     UserSerializer, TeamSerializer, ActivitySerializer,
-    LeaderboardSerializer, WorkoutSerializer
+    LeaderboardSerializer, LeaderboardBucketSerializer, WorkoutSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 class UserViewSet(viewsets.ModelViewSet):
     """
@@ -21,6 +48,27 @@ class UserViewSet(viewsets.ModelViewSet):
     ordering = ['name']  # Default ordering
     search_fields = ['name', 'email']
 
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        """
+        Create many users in one request: a JSON list (or `{"users": [...]}`)
+        of objects with name, email, password and optional team_id
+        """
+        rows = request.data if isinstance(request.data, list) else request.data.get('users')
+        if not isinstance(rows, list):
+            raise ValidationError({'users': 'Expected a list of users.'})
+        if len(rows) > settings.USER_BULK_MAX:
+            raise ValidationError({'users': f'At most {settings.USER_BULK_MAX} users per request.'})
+        created, errors = provision_users(rows)
+        response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    def perform_update(self, serializer):
+        previous = (serializer.instance.name, serializer.instance.team_id)
+        user = serializer.save()
+        if (user.name, user.team_id) != previous:
+            background.submit(propagate_user, str(user._id))
+
 
 class TeamViewSet(viewsets.ModelViewSet):
     """
@@ -29,14 +77,154 @@ class TeamViewSet(viewsets.ModelViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
 
+    def perform_update(self, serializer):
+        previous_name = serializer.instance.name
+        team = serializer.save()
+        if team.name != previous_name:
+            background.submit(propagate_team_name, str(team._id), team.name)
+
+
+def _parse_date_param(request, name):
+    """Parse an ISO date or datetime query parameter into an aware datetime"""
+    raw = request.query_params.get(name)
+    if not raw:
+        return None
+    value = parse_datetime(raw)
+    if value is None:
+        day = parse_date(raw)
+        if day is None:
+            raise ValidationError({name: 'Expected an ISO 8601 date or datetime.'})
+        value = datetime(day.year, day.month, day.day)
+    return _aware(value)
+
+
+def _aware(value):
+    if timezone.is_naive(value):
+        return timezone.make_aware(value, timezone.utc)
+    return value
+
+
+class MergedActivities:
+    """
+    Hot activities and archived ones in a date range, newest first, as a lazy sequence.
+
+    Paginators only call ``count()`` and slice, so a page ending at row N reads
+    at most N rows from the hot queryset and N from the archives and merges
+    them, instead of loading the whole range.
+    """
+
+    def __init__(self, queryset, date_after, date_before):
+        self.queryset = queryset
+        self.date_after = date_after
+        self.date_before = date_before
+
+    def count(self):
+        return self.queryset.count() + count_archived(self.date_after, self.date_before)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        stop = index.stop if index.stop is not None else self.count()
+        hot = list(self.queryset[:stop])
+        seen = {str(activity._id) for activity in hot}
+        archived = [
+            Activity(**{field.attname: document.get(field.attname) for field in Activity._meta.concrete_fields})
+            for document in find_archived(self.date_after, self.date_before, limit=stop)
+            if str(document['_id']) not in seen
+        ]
+        merged = heapq.merge(hot, archived, key=lambda activity: _aware(activity.date), reverse=True)
+        return list(itertools.islice(merged, index.start or 0, stop))
+
 
 class ActivityViewSet(viewsets.ModelViewSet):
     """
     API endpoint for activities
+
+    Supports `?date_after=` / `?date_before=` range filters. Ranges reaching
+    back past the archive cutoff transparently include archived activities.
     """
-    queryset = Activity.objects.all()
+    queryset = Activity.objects.all().order_by('-date')
     serializer_class = ActivitySerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        date_after = _parse_date_param(self.request, 'date_after')
+        date_before = _parse_date_param(self.request, 'date_before')
+        if date_after:
+            queryset = queryset.filter(date__gte=date_after)
+        if date_before:
+            queryset = queryset.filter(date__lt=date_before)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        date_after = _parse_date_param(request, 'date_after')
+        if date_after is None or date_after >= archive_cutoff():
+            return super().list(request, *args, **kwargs)
+
+        date_before = _parse_date_param(request, 'date_before')
+        merged = MergedActivities(self.filter_queryset(self.get_queryset()), date_after, date_before)
+        page = self.paginate_queryset(merged)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(merged[:merged.count()], many=True).data)
+
+    def perform_create(self, serializer):
+        config = get_write_buffer_config()
+        if not config['ENABLED']:
+            score = apply_score(dict(serializer.validated_data))
+            activity = serializer.save(points=score['points'], scoring_version=score['scoring_version'])
+            _update_leaderboard(apply_activities, [_scoring_fields(activity)])
+            return
+
+        # Buffered path: acknowledge only once the batch holding this document is written
+        document = apply_score(dict(serializer.validated_data, _id=ObjectId()))
+        try:
+            future = get_activity_buffer().submit(document)
+        except BufferFull:
+            raise ServiceUnavailable('Activity writes are temporarily saturated, please retry.')
+        try:
+            future.result(timeout=config['ACK_TIMEOUT'])
+        except FutureTimeoutError:
+            raise ServiceUnavailable('Activity write was not acknowledged in time; it may still be applied.')
+        except ActivityRejected as exc:
+            raise ValidationError({'non_field_errors': [f'Activity was rejected: {exc}']})
+        except PyMongoError:
+            logger.exception('Buffered activity batch failed')
+            raise ServiceUnavailable('Activity storage is temporarily unavailable, please retry.')
+        serializer.instance = Activity(**document)
+
+    def perform_update(self, serializer):
+        previous = _scoring_fields(serializer.instance)
+        score = apply_score(dict(previous, **serializer.validated_data))
+        activity = serializer.save(points=score['points'], scoring_version=score['scoring_version'])
+        _update_leaderboard(revise_activities, [previous], [_scoring_fields(activity)])
+
+    def perform_destroy(self, instance):
+        previous = _scoring_fields(instance)
+        instance.delete()
+        _update_leaderboard(revise_activities, [previous], [])
+
+
+def _scoring_fields(activity):
+    """The fields of an Activity that scoring and the leaderboard depend on"""
+    return {
+        'user_id': activity.user_id, 'activity_type': activity.activity_type, 'calories': activity.calories,
+        'distance': activity.distance, 'points': activity.points, 'date': activity.date,
+    }
+
+
+def _update_leaderboard(fn, *args):
+    # The activity write has already succeeded; never make the client retry (and duplicate) it
+    # Only the deltas that were not applied are retried, so nothing is counted twice
+    try:
+        fn(*args)
+    except LeaderboardWriteFailed as exc:
+        logger.exception('Leaderboard update %s failed; retrying in the background', fn.__name__)
+        background.submit(apply_increments, exc.increments, exc.buckets)
+
 
 class LeaderboardViewSet(viewsets.ModelViewSet):
     """
@@ -45,6 +233,39 @@ class LeaderboardViewSet(viewsets.ModelViewSet):
     queryset = Leaderboard.objects.all()
     serializer_class = LeaderboardSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        All-time leaderboard, or a time window with
+        `?window=day|week|month&period=2026-W42[&limit=10][&user_id=...]`
+        """
+        window = request.query_params.get('window')
+        if not window:
+            return super().list(request, *args, **kwargs)
+        if window not in WINDOWS:
+            raise ValidationError({'window': f'Expected one of {", ".join(WINDOWS)}.'})
+
+        period = request.query_params.get('period') or period_key(window, timezone.now())
+        try:
+            period_bounds(window, period)
+        except ValueError as exc:
+            raise ValidationError({'period': str(exc)})
+        try:
+            limit = int(request.query_params.get('limit', settings.REST_FRAMEWORK['PAGE_SIZE']))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        limit = max(1, min(limit, settings.LEADERBOARD_WINDOW_MAX_LIMIT))
+
+        results = LeaderboardBucketSerializer(window_top(window, period, limit), many=True).data
+        for entry, rank in zip(results, competition_ranks([entry['total_points'] for entry in results])):
+            entry['rank'] = rank
+        data = {'window': window, 'period': period, 'results': results}
+
+        user_id = request.query_params.get('user_id')
+        if user_id:
+            bucket, rank = window_rank(window, period, user_id)
+            data['user'] = dict(LeaderboardBucketSerializer(bucket).data, rank=rank) if bucket else None
+        return Response(data)
+
 
 class WorkoutViewSet(viewsets.ModelViewSet):
     """
@@ -52,3 +273,50 @@ class WorkoutViewSet(viewsets.ModelViewSet):
     """
     queryset = Workout.objects.all()
     serializer_class = WorkoutSerializer
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """
+    Admin-only endpoint listing stored request profiles
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        try:
+            limit = int(request.query_params.get('frames', 5))
+        except ValueError:
+            raise ValidationError({'frames': 'Expected an integer.'})
+        limit = max(limit, 0)
+        profiles = []
+        for record in load_profiles():
+            summary = {key: value for key, value in record.items() if key != 'frames'}
+            summary['top_frames'] = record.get('frames', [])[:limit]
+            profiles.append(summary)
+        return Response(profiles)
+
+    def retrieve(self, request, pk=None):
+        record = load_profile(pk)
+        if record is None:
+            raise NotFound('Profile not found.')
+        return Response(record)
+
+
+class DashboardViewSet(viewsets.ViewSet):
+    """
+    Frontend dashboard in one response
+    """
+
+    def list(self, request):
+        """
+        Leaderboard top-K, recent activities, teams summary and featured
+        workouts; pick a subset with `?sections=leaderboard,teams`
+        """
+        requested = request.query_params.get('sections')
+        sections = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(SECTIONS)
+        unknown = [name for name in sections if name not in SECTIONS]
+        if unknown or not sections:
+            raise ValidationError({'sections': f'Expected a comma-separated subset of {", ".join(SECTIONS)}.'})
+        data, errors = build_dashboard(dict.fromkeys(sections))
+        if errors:
+            data['errors'] = errors
+        return Response(data)
@@ -0,0 +1,183 @@
+"""
+Group-commit write buffer for activity inserts.
+
+When ``ACTIVITY_WRITE_BUFFER['ENABLED']`` is set, ``ActivityViewSet.create``
+hands its document to the process-wide ``ActivityWriteBuffer`` instead of
+inserting it directly. A background thread flushes pending documents with one
+unordered ``insert_many`` and one leaderboard ``bulk_write`` whenever
+``MAX_BATCH`` documents are waiting or ``FLUSH_INTERVAL`` seconds have passed.
+
+Durability: a request is only acknowledged once the batch containing its
+document has been written with the configured write concern, so a ``201``
+means the same thing as on the unbuffered path. If the buffer already holds
+``MAX_PENDING`` documents, ``submit`` raises ``BufferFull`` and the caller
+should reject the request so clients back off.
+
+Futures are resolved from the insert result alone: documents the server
+rejected fail with ``ActivityRejected``, a failure of the whole insert fails
+every future with the ``PyMongoError``. Once the insert has succeeded the
+leaderboard update can no longer fail the request; if it errors the deltas that
+were not applied are retried on the background queue and ``manage.py rescore``
+rebuilds totals in any case.
+"""
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from pymongo.errors import BulkWriteError, PyMongoError
+from pymongo.write_concern import WriteConcern
+
+from . import background
+from .leaderboard import LeaderboardWriteFailed, apply_activities, apply_increments
+from .mongo import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Raised when the buffer has reached MAX_PENDING documents"""
+
+
+class ActivityRejected(Exception):
+    """Raised for a single document the server refused to insert"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def get_config():
+    config = {
+        'ENABLED': False,
+        'MAX_BATCH': 500,
+        'FLUSH_INTERVAL': 0.05,
+        'MAX_PENDING': 5000,
+        'ACK_TIMEOUT': 5.0,
+        'JOURNAL': False,
+    }
+    config.update(getattr(settings, 'ACTIVITY_WRITE_BUFFER', {}))
+    return config
+
+
+def write_activities(documents, journal=False):
+    """
+    Insert a batch of activities and fold the successful ones into the leaderboard.
+
+    Returns a dict mapping the index of each rejected document to its
+    ``ActivityRejected`` error. Errors other than per-document write errors
+    propagate. A leaderboard failure after a successful insert is logged and
+    retried in the background rather than raised, since the activities are
+    already committed.
+    """
+    db = get_db()
+    activities = db.activities.with_options(write_concern=WriteConcern(w=1, j=journal))
+    failures = {}
+    try:
+        activities.insert_many(documents, ordered=False)
+    except BulkWriteError as exc:
+        for error in exc.details.get('writeErrors', []):
+            failures[error['index']] = ActivityRejected(error.get('errmsg', 'write error'), error.get('code'))
+    written = [document for index, document in enumerate(documents) if index not in failures]
+    try:
+        apply_activities(written, db=db)
+    except LeaderboardWriteFailed as exc:
+        logger.exception('Leaderboard update for %d buffered activities failed; retrying', len(written))
+        background.submit(apply_increments, exc.increments, exc.buckets)
+    return failures
+
+
+class ActivityWriteBuffer:
+    """Coalesces concurrent activity inserts into periodic bulk writes"""
+
+    def __init__(self, flush, max_batch=500, flush_interval=0.05, max_pending=5000):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='activity-write-buffer', daemon=True)
+        self._thread.start()
+
+    def submit(self, document):
+        """Queue a document; the returned Future resolves once it is written"""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Write buffer is closed')
+            if len(self._pending) >= self.max_pending:
+                raise BufferFull()
+            self._pending.append((document, future))
+            if len(self._pending) in (1, self.max_batch):
+                self._condition.notify()
+        return future
+
+    def close(self):
+        """Flush everything still pending and stop the flusher thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _take_batch(self):
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            finished = self._closed and not self._pending
+        return batch, finished
+
+    def _run(self):
+        while True:
+            batch, finished = self._take_batch()
+            if batch:
+                self._write(batch)
+            if finished:
+                return
+
+    def _write(self, batch):
+        documents = [document for document, _ in batch]
+        try:
+            failures = self.flush(documents)
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for index, (document, future) in enumerate(batch):
+            if index in failures:
+                error = failures[index]
+                future.set_exception(error if isinstance(error, Exception) else ActivityRejected(error))
+            else:
+                future.set_result(document)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_activity_buffer():
+    """Return the process-wide activity buffer, starting it on first use"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = get_config()
+                _buffer = ActivityWriteBuffer(
+                    flush=lambda documents: write_activities(documents, journal=config['JOURNAL']),
+                    max_batch=config['MAX_BATCH'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    max_pending=config['MAX_PENDING'],
+                )
+                atexit.register(_buffer.close)
+    return _buffer